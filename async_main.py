@@ -0,0 +1,295 @@
+import argparse
+import asyncio
+import concurrent.futures
+import logging
+import os
+import shutil
+import signal
+import threading
+import time
+from typing import Any, Optional
+
+from crawler import Crawler, CrawlDataEncoder, CrawlInterrupted, CrawlResults, Heartbeat, LandingPageDown, CHECKPOINT_FILE
+from main import progress
+from node_main import Admission
+from utils.alias_index import AliasIndex
+from utils.capture import CapturePolicy
+from utils.firefox_profile import build_template
+from utils.prefilter import read_prefilter
+from utils.process_group import SiteProcessGroup
+from utils.results_log import ResultsLog
+from utils.work_queue import WorkQueue
+import config
+
+"""
+Crawl many sites at once from a single process.
+
+Each site is crawled by the existing synchronous Crawler on its own thread,
+and a single asyncio event loop leases sites, watches heartbeats, extends
+leases, and records results. Since a crawl spends most of its time blocked
+on page loads and `time.sleep(wait_time)`, the waits of concurrent sites
+overlap without starting a Python process per site.
+
+Selenium 4.2 (required by BannerClick) has no asynchronous or WebDriver BiDi
+client, so the browser sessions themselves remain synchronous.
+"""
+
+logger = logging.getLogger(config.LOGGER_NAME)
+
+
+class CrawlStopped(CrawlInterrupted):
+    """
+    Raised from the heartbeat callback to stop a crawl at its next heartbeat.
+    The checkpoint is kept, so a requeued crawl resumes.
+    """
+    pass
+
+
+class SiteCrawl:
+    """
+    A site being crawled on a worker thread.
+    """
+
+    def __init__(self, domain: str, template_profile: Optional[str], url_hint: Optional[str], alias_index: Optional[AliasIndex]) -> None:
+        self.domain = domain
+        self.start_time = time.time()
+
+        self.last_heartbeat: Optional[Heartbeat] = None
+        self.last_progress_time = time.time()
+        self.stop_reason: Optional[str] = None
+
+        self.crawler = Crawler(
+            domain,
+            headless=True,
+            wait_time=config.WAIT_TIME,
+            heartbeat=self.heartbeat,
+            resume=True,
+            driver_pool_size=config.DRIVER_POOL_SIZE,
+            template_profile=template_profile,
+            url_hint=url_hint,
+            alias_index=alias_index,
+            resource_policy=config.RESOURCE_POLICY,
+            capture_policy=CapturePolicy.from_config(),
+            fast_reset=config.FAST_RESET,
+            memory_budget=config.BROWSER_MEMORY_BUDGET,
+            settle_time=config.WAIT_SETTLE_TIME,
+        )
+
+    def heartbeat(self, heartbeat: Heartbeat) -> None:
+        """
+        Record progress. Called on the crawl thread.
+
+        Heartbeats that repeat the last phase and action (e.g., from retries of the same page) are not progress.
+        """
+        if self.stop_reason is not None:
+            raise CrawlStopped(self.stop_reason)
+
+        if self.last_heartbeat is None or progress(heartbeat) != progress(self.last_heartbeat):
+            self.last_progress_time = time.time()
+        self.last_heartbeat = heartbeat
+
+    def run(self) -> CrawlResults:
+        """
+        Crawl the site. Runs on a worker thread.
+
+        Returns a result even if the crawl fails or is stopped.
+        """
+        thread = threading.current_thread()
+        name, thread.name = thread.name, self.domain  # Identifies the site in log records
+        try:
+            # @crawl_algo records LandingPageDown, CrawlStopped, and other exceptions in the results
+            return self.crawler.classification_algo(total_actions=config.TOTAL_ACTIONS, clickstream_length=config.CLICKSTREAM_LENGTH)
+        except Exception:  # skipcq: PYL-W0703
+            # Raised while cleaning up after the crawl (e.g., quitting the browser)
+            logger.critical(f"Unexpected exception for '{self.domain}'.", exc_info=True)
+            self.crawler.results["unexpected_exception"] = True
+            return self.crawler.results
+        finally:
+            thread.name = name
+
+    def stop(self, reason: str) -> None:
+        """
+        Stop the crawl at its next heartbeat, and quit its browser to interrupt any blocking call.
+        """
+        self.stop_reason = reason
+        try:
+            self.crawler.driver.quit()
+        except Exception:  # skipcq: PYL-W0703
+            pass
+
+
+class Engine:
+    """
+    Crawl up to `concurrency` sites at once until the queue is empty.
+    """
+
+    def __init__(self, worker_id: str, concurrency: int, admit: Optional[Admission] = None) -> None:
+        """
+        Args:
+            worker_id: Unique name of this worker. Used for the results shard and queue bookkeeping.
+            concurrency: Number of sites crawled at once.
+            admit: Blocks until a new site may start. Defaults to None, where sites start immediately.
+        """
+        self.worker_id = worker_id
+        self.concurrency = concurrency
+        self.admit = admit
+
+        self.results = ResultsLog(config.RESULTS_PATH, shard=worker_id, cls=CrawlDataEncoder)
+        self.queue = WorkQueue(config.QUEUE_PATH, config.QUEUE_VISIBILITY_TIMEOUT, config.QUEUE_MAX_ATTEMPTS)
+
+        # One thread per site, plus threads for queue and results bookkeeping
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=2 * concurrency, thread_name_prefix="crawl")
+        self.template_profile: Optional[str] = None
+        self.reachability = read_prefilter(config.PREFILTER_PATH)
+        self.alias_index = AliasIndex(config.ALIAS_INDEX_PATH) if config.COLLAPSE_ALIASES else None
+        self.sites: dict[str, SiteCrawl] = {}
+        self.stopping = False
+
+    async def run_blocking(self, func: Any, *args: Any) -> Any:
+        """
+        Run a blocking function on the executor.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def crawl_site(self, domain: str) -> None:
+        """
+        Crawl a leased site, stopping it if it stalls, and record its result.
+
+        Browser processes left by the crawl (e.g., after a stall) are killed once it ends.
+        """
+        # A previous lease on this site expired before it was acknowledged.
+        # The crawl resumes from its checkpoint if it has one, otherwise it starts over.
+        data_path = f"{config.DATA_PATH}{domain}/"
+        if os.path.exists(data_path) and not os.path.exists(data_path + CHECKPOINT_FILE):
+            logger.warning(f"Removing incomplete crawl data for '{domain}'.")
+            shutil.rmtree(data_path)
+
+        try:
+            site = SiteCrawl(domain, self.template_profile, self.reachability.get(domain, {}).get("url"), self.alias_index)
+        except Exception:  # skipcq: PYL-W0703
+            logger.critical(f"Failed to start crawl for '{domain}'.", exc_info=True)
+            await self.run_blocking(self.results.append, domain, {"data_path": data_path, "landing_page_down": False, "unexpected_exception": True})
+            await self.run_blocking(self.queue.ack, domain, self.worker_id)
+            return
+        self.sites[domain] = site
+        group = SiteProcessGroup(domain)
+        task = asyncio.ensure_future(self.run_blocking(site.run))
+
+        # Wait for the crawl to finish as long as it keeps making progress
+        last_extend_time = time.time()
+        stalled = False
+        while not task.done():
+            await asyncio.wait({task}, timeout=config.HEARTBEAT_POLL_INTERVAL)
+            group.track(site.crawler.browser_pids)
+            await self.run_blocking(group.sample)
+
+            # Keep the lease while the crawl is making progress
+            if site.last_progress_time - last_extend_time > config.STALL_TIMEOUT:
+                if not await self.run_blocking(self.queue.extend, domain, self.worker_id):
+                    logger.warning(f"Lost the lease on '{domain}'. Its result will not complete it in the queue.")
+                last_extend_time = site.last_progress_time
+
+            if not task.done() and site.stop_reason is None and time.time() - site.last_progress_time > config.STALL_TIMEOUT:
+                logger.warning(f"Stopping crawl of '{domain}' after {config.STALL_TIMEOUT} seconds without progress. Last heartbeat: {site.last_heartbeat}.")
+                stalled = True
+                await self.run_blocking(site.stop, "stalled")
+
+                # A thread cannot be killed. If the crawl does not stop, abandon it.
+                done, _ = await asyncio.wait({task}, timeout=config.TERMINATE_TIMEOUT)
+                if not done:
+                    logger.critical(f"Crawl of '{domain}' did not stop. Abandoning its thread.")
+                    break
+
+        del self.sites[domain]
+
+        # Kill any browser processes that outlived the crawl, including those of an abandoned thread
+        group.track(site.crawler.browser_pids)
+        orphans = await self.run_blocking(group.reap)
+
+        result: CrawlResults = {"data_path": data_path}
+        if task.done():
+            # SiteCrawl.run returns a result for failed crawls, so these only guard the other sites of the engine
+            try:
+                result = task.result()
+            except LandingPageDown:
+                result.update({"landing_page_down": True, "unexpected_exception": False})
+            except Exception:  # skipcq: PYL-W0703
+                logger.critical(f"Unexpected exception for '{domain}'.", exc_info=True)
+                result.update({"landing_page_down": False, "unexpected_exception": True})
+
+        # A stopped crawl ends with CrawlStopped, which @crawl_algo records as an interruption
+        if site.stop_reason is not None:
+            if site.stop_reason == "SIGTERM":
+                result["SIGTERM"] = True
+        result.setdefault("total_time", time.time() - site.start_time)
+        # Of the browsers only: crawl threads share this process, and their temp files are not separated per site
+        result["peak_rss"] = group.peak_rss
+        result["cpu_time"] = group.cpu_time
+        result["orphans_killed"] = orphans
+
+        # Stalled and SIGTERM-stopped sites keep their checkpoint and resume when leased again
+        if stalled or site.stop_reason == "SIGTERM":
+            if await self.run_blocking(self.queue.nack, domain, self.worker_id):
+                logger.warning(f"Requeued '{domain}'.")
+                return
+
+            if stalled:
+                result["stalled"] = True
+
+        await self.run_blocking(self.results.append, domain, result)
+        await self.run_blocking(self.queue.ack, domain, self.worker_id)
+
+    async def slot(self) -> None:
+        """
+        Lease and crawl sites one at a time until the queue is empty.
+        """
+        while not self.stopping:
+            if self.admit is not None:
+                await self.run_blocking(self.admit)
+
+            domain = await self.run_blocking(self.queue.lease, self.worker_id)
+            if domain is None:
+                return
+
+            print(domain)
+            await self.crawl_site(domain)
+
+    def stop(self) -> None:
+        """
+        Stop all crawls and lease no more sites.
+        """
+        logger.warning("Received SIGTERM, stopping all crawls.")
+        self.stopping = True
+        for site in self.sites.values():
+            threading.Thread(target=site.stop, args=("SIGTERM",), daemon=True).start()
+
+    async def run(self) -> None:
+        """
+        Crawl until the queue is empty.
+        """
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self.stop)
+
+        if config.FIREFOX_TEMPLATE_PROFILE:
+            self.template_profile = await self.run_blocking(build_template, config.FIREFOX_PROCESS_COUNT)
+
+        await asyncio.gather(*(self.slot() for _ in range(self.concurrency)))
+        logger.info("Queue is empty, exiting.")
+
+        self.executor.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl many sites at once from a single process.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Number of sites crawled at once.")
+    parser.add_argument("--worker-id", default=os.getenv("SLURM_ARRAY_TASK_ID", "0"), help="Defaults to SLURM_ARRAY_TASK_ID.")
+    parser.add_argument("--no-admission", action="store_true", help="Start sites without waiting for memory and CPU (see NODE_* in config.py).")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.INFO)
+    log_file = logging.FileHandler(f"{config.DATA_PATH}/{args.worker_id}.log", "a")
+    log_file.setLevel(logging.DEBUG)
+    log_file.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(threadName)s]: %(message)s", "%Y-%m-%d %H:%M:%S"))
+    logger.addHandler(log_file)
+
+    admit = None if args.no_admission else Admission(config.NODE_MIN_AVAILABLE_MEMORY, config.NODE_MAX_LOAD, config.NODE_SETTLE_TIME)
+    asyncio.run(Engine(args.worker_id, args.concurrency, admit).run())
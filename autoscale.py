@@ -0,0 +1,260 @@
+import argparse
+import logging
+import math
+import subprocess
+import time
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+from sbatch_main import sbatch_run
+from utils.work_queue import WorkQueue, PENDING, LEASED, DONE, FAILED
+import config
+
+"""
+Scale the Slurm worker array to finish the crawl by a target time.
+
+Every interval, the autoscaler measures queue depth and per-worker throughput,
+estimates how many workers are needed to empty the queue by the deadline,
+and submits array tasks to match. To scale down, queued array tasks are
+cancelled, and running workers are asked to exit before their next site
+(see STOP_PATH in config.py). Running workers are never cancelled, since
+a worker between sites may be leasing one.
+"""
+
+logger = logging.getLogger(config.LOGGER_NAME)
+
+
+class SlurmSubmitter:
+    """
+    Submit, list, and cancel crawl worker array tasks.
+
+    The Slurm commands can be replaced by stand-ins (e.g., scripts that
+    emulate sbatch/squeue/scancel locally) to test the autoscaler without Slurm.
+    """
+
+    def __init__(self, job_name: str = "cookie", sbatch: str = "sbatch", squeue: str = "squeue", scancel: str = "scancel") -> None:
+        """
+        Args:
+            job_name: Slurm job name of the crawl workers. Defaults to "cookie" (see sbatch_main.py).
+            sbatch: The sbatch command. Defaults to "sbatch".
+            squeue: The squeue command. Defaults to "squeue".
+            scancel: The scancel command. Defaults to "scancel".
+        """
+        self.job_name = job_name
+        self.sbatch = sbatch
+        self.squeue = squeue
+        self.scancel = scancel
+
+    def submit(self, task_ids: list[int]) -> None:
+        """
+        Submit array tasks with the given SLURM_ARRAY_TASK_IDs.
+        """
+        jobs = ",".join(str(task_id) for task_id in task_ids)
+        sbatch_run('python3 main.py', job_name=self.job_name, jobs=jobs, memory=4, cpus=2, sbatch=self.sbatch)
+
+    def tasks(self) -> dict[int, tuple[str, str]]:
+        """
+        Return a dictionary mapping SLURM_ARRAY_TASK_ID to (Slurm job ID, state) for all queued and running array tasks.
+        """
+        output = subprocess.run(
+            [self.squeue, "--noheader", "--array", "--name", self.job_name, "--format", "%i %T"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+        tasks = {}
+        for line in output.splitlines():
+            job_id, state = line.split()
+            if "_" not in job_id or state not in ("PENDING", "RUNNING"):
+                continue
+
+            task_id = job_id.split("_")[1]
+            if task_id.isdigit():
+                tasks[int(task_id)] = (job_id, state)
+
+        return tasks
+
+    def cancel(self, job_ids: list[str]) -> None:
+        """
+        Cancel array tasks by Slurm job ID (e.g., 1234_5).
+        """
+        subprocess.run([self.scancel, *job_ids], check=True)
+
+
+class Autoscaler:
+    """
+    Adjust the number of crawl workers so the queue is empty by a deadline.
+    """
+
+    def __init__(
+            self,
+            queue: WorkQueue,
+            submitter: SlurmSubmitter,
+            deadline: float,
+            min_workers: int = 1,
+            max_workers: int = 100,
+            window: float = 60 * 60,
+    ) -> None:
+        """
+        Args:
+            queue: The crawl queue.
+            submitter: Used to submit and cancel worker array tasks.
+            deadline: Target finish time (seconds since epoch).
+            min_workers: Minimum number of workers while sites remain. Defaults to 1.
+            max_workers: Maximum number of workers. Defaults to 100.
+            window: Time (seconds) over which throughput is measured. Defaults to 1 hour.
+        """
+        self.queue = queue
+        self.submitter = submitter
+        self.deadline = deadline
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.window = window
+
+        # (time, completed sites, running workers)
+        self.samples: deque[tuple[float, int, int]] = deque()
+
+        # Running workers asked to exit before their next site
+        self.stopping: set[int] = set()
+
+    def worker_throughput(self) -> Optional[float]:
+        """
+        Return the measured sites per second per running worker, or None if not yet measurable.
+        """
+        if len(self.samples) < 2:
+            return None
+
+        (start, start_completed, _), (end, end_completed, _) = self.samples[0], self.samples[-1]
+        workers = sum(sample[2] for sample in self.samples) / len(self.samples)
+        if end_completed == start_completed or workers == 0:
+            return None
+
+        return (end_completed - start_completed) / (end - start) / workers
+
+    def request_stop(self, task_ids: list[int]) -> None:
+        """
+        Ask running workers to exit before their next site.
+        """
+        Path(config.STOP_PATH).mkdir(parents=True, exist_ok=True)
+        for task_id in task_ids:
+            (Path(config.STOP_PATH) / str(task_id)).touch()
+        self.stopping.update(task_ids)
+
+    def submit(self, tasks: dict[int, tuple[str, str]], count: int) -> None:
+        """
+        Submit `count` new workers.
+
+        Args:
+            tasks: Queued and running array tasks (see SlurmSubmitter.tasks).
+            count: Number of workers to submit.
+        """
+        # Task IDs must be unique across submissions since they name results shards and logs
+        first = max(tasks, default=-1) + 1
+        first = max(first, max((int(w) for w in self.queue.leases() if w.isdigit()), default=-1) + 1)
+        new_tasks = list(range(first, first + count))
+        logger.info(f"Submitting workers {new_tasks}.")
+        self.submitter.submit(new_tasks)
+
+    def step(self) -> None:
+        """
+        Measure progress and submit or cancel workers once.
+        """
+        now = time.time()
+        counts = self.queue.counts()
+        remaining = counts[PENDING] + counts[LEASED]
+        tasks = self.submitter.tasks()
+        running = [task_id for task_id, (_, state) in tasks.items() if state == "RUNNING"]
+
+        self.samples.append((now, counts[DONE] + counts[FAILED], len(running)))
+        while now - self.samples[0][0] > self.window:
+            self.samples.popleft()
+
+        # Workers asked to stop are finishing their current site and no longer count
+        self.stopping &= set(tasks)
+        workers = len(tasks) - len(self.stopping)
+
+        throughput = self.worker_throughput()
+        if throughput is None:
+            # E.g., no worker is running yet, or all workers died. Keep the minimum so that throughput can be measured
+            logger.info(f"{remaining} sites remaining with {workers} workers. Throughput not yet measurable.")
+            target = min(self.min_workers, remaining)
+            if target > workers:
+                self.submit(tasks, target - workers)
+            return
+
+        time_left = self.deadline - now
+        if time_left > 0:
+            target = math.ceil(remaining / (throughput * time_left))
+        else:
+            target = self.max_workers
+        target = min(max(target, self.min_workers), self.max_workers, remaining)
+
+        eta = remaining / (throughput * max(len(running), 1))
+        logger.info(
+            f"{remaining} sites remaining, {throughput * 3600:.2f} sites/hour/worker, "
+            f"ETA {eta / 3600:.1f} hours with {len(running)} running workers. Target is {target} workers."
+        )
+
+        if target > workers:
+            self.submit(tasks, target - workers)
+
+        elif target < workers:
+            # Cancel queued tasks first, then stop running workers, preferring those that do not hold a lease
+            excess = workers - target
+            pending = [task_id for task_id, (_, state) in tasks.items() if state == "PENDING"][:excess]
+            if pending:
+                logger.info(f"Cancelling queued workers {pending}.")
+                self.submitter.cancel([tasks[task_id][0] for task_id in pending])
+
+            busy = self.queue.leases()
+            to_stop = sorted(
+                (task_id for task_id in running if task_id not in self.stopping),
+                key=lambda task_id: str(task_id) in busy,
+            )[:excess - len(pending)]
+            if to_stop:
+                logger.info(f"Asking workers {to_stop} to exit before their next site.")
+                self.request_stop(to_stop)
+
+    def run(self, interval: float) -> None:
+        """
+        Run the autoscaler until the queue is empty.
+
+        Args:
+            interval: Time (seconds) between steps.
+        """
+        while True:
+            counts = self.queue.counts()
+            if counts[PENDING] + counts[LEASED] == 0:
+                logger.info("Queue is empty, exiting.")
+                return
+
+            self.step()
+            time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scale the Slurm worker array to finish the crawl by a target time.")
+    parser.add_argument("--hours", type=float, required=True, help="Target time to finish the crawl, in hours from now.")
+    parser.add_argument("--min-workers", type=int, default=1)
+    parser.add_argument("--max-workers", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=10 * 60, help="Seconds between scaling decisions.")
+    parser.add_argument("--sbatch", default="sbatch", help="sbatch command or a local stand-in.")
+    parser.add_argument("--squeue", default="squeue", help="squeue command or a local stand-in.")
+    parser.add_argument("--scancel", default="scancel", help="scancel command or a local stand-in.")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.INFO)
+    log_stream = logging.StreamHandler()
+    log_stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s: %(message)s", "%Y-%m-%d %H:%M:%S"))
+    logger.addHandler(log_stream)
+
+    autoscaler = Autoscaler(
+        WorkQueue(config.QUEUE_PATH, config.QUEUE_VISIBILITY_TIMEOUT, config.QUEUE_MAX_ATTEMPTS),
+        SlurmSubmitter(sbatch=args.sbatch, squeue=args.squeue, scancel=args.scancel),
+        deadline=time.time() + args.hours * 3600,
+        min_workers=args.min_workers,
+        max_workers=args.max_workers,
+    )
+    autoscaler.run(args.interval)
@@ -0,0 +1,121 @@
+import os
+import tempfile
+import time
+
+from autoscale import Autoscaler
+from utils.work_queue import WorkQueue
+import config
+
+"""
+Test the autoscaler (see autoscale.py) against a local work queue and a fake Slurm submitter.
+
+Run with `python3 autoscale_test.py` or pytest.
+"""
+
+
+class FakeSubmitter:
+    """
+    Stands in for SlurmSubmitter, keeping array tasks in memory.
+    """
+
+    def __init__(self, tasks: dict[int, str]) -> None:
+        """
+        Args:
+            tasks: State ("PENDING" or "RUNNING") of each existing array task.
+        """
+        self.states = dict(tasks)
+        self.submitted: list[int] = []
+        self.cancelled: list[str] = []
+
+    def submit(self, task_ids: list[int]) -> None:
+        self.submitted += task_ids
+        for task_id in task_ids:
+            self.states[task_id] = "PENDING"
+
+    def tasks(self) -> dict[int, tuple[str, str]]:
+        return {task_id: (f"1234_{task_id}", state) for task_id, state in self.states.items()}
+
+    def cancel(self, job_ids: list[str]) -> None:
+        self.cancelled += job_ids
+        for job_id in job_ids:
+            del self.states[int(job_id.split("_")[1])]
+
+
+def make_queue(sites: int, done: int, leased_by: list[str]) -> WorkQueue:
+    """
+    Return a queue of `sites` sites, of which `done` are completed and one is leased by each worker in `leased_by`.
+    """
+    queue = WorkQueue(os.path.join(tempfile.mkdtemp(), "queue.sqlite"))
+    queue.enqueue(f"site{i}.test" for i in range(sites))
+    for _ in range(done):
+        queue.ack(queue.lease(worker="done"), "done")  # type: ignore[arg-type]
+    for worker in leased_by:
+        queue.lease(worker=worker)
+    return queue
+
+
+def test_start_from_empty_array() -> None:
+    config.STOP_PATH = tempfile.mkdtemp() + "/"
+    queue = make_queue(sites=10, done=0, leased_by=[])
+    submitter = FakeSubmitter({})
+
+    Autoscaler(queue, submitter, deadline=time.time() + 3600, min_workers=2).step()  # type: ignore[arg-type]
+
+    # Throughput cannot be measured without workers, so the minimum is submitted
+    assert submitter.submitted == [0, 1], submitter.submitted
+
+
+def test_scale_up() -> None:
+    config.STOP_PATH = tempfile.mkdtemp() + "/"
+    queue = make_queue(sites=100, done=10, leased_by=["0", "1"])
+    submitter = FakeSubmitter({0: "RUNNING", 1: "RUNNING"})
+    autoscaler = Autoscaler(queue, submitter, deadline=time.time() + 7000)  # type: ignore[arg-type]
+
+    # 2 workers completed 10 sites in the last half hour
+    autoscaler.samples.append((time.time() - 1800, 0, 2))
+    autoscaler.step()
+
+    # 90 remaining sites at 10 sites/hour/worker in 7000 seconds need 5 workers
+    assert submitter.submitted == [2, 3, 4], submitter.submitted
+    assert submitter.cancelled == []
+
+
+def test_scale_down() -> None:
+    config.STOP_PATH = tempfile.mkdtemp() + "/"
+    queue = make_queue(sites=100, done=10, leased_by=["0"])
+    submitter = FakeSubmitter({0: "RUNNING", 1: "RUNNING", 2: "PENDING"})
+    autoscaler = Autoscaler(queue, submitter, deadline=time.time() + 1000 * 3600, min_workers=1)  # type: ignore[arg-type]
+
+    autoscaler.samples.append((time.time() - 1800, 0, 2))
+    autoscaler.step()
+
+    # The queued task is cancelled, and the running worker without a lease is asked to exit between sites
+    assert submitter.submitted == []
+    assert submitter.cancelled == ["1234_2"], submitter.cancelled
+    assert os.listdir(config.STOP_PATH) == ["1"], os.listdir(config.STOP_PATH)
+
+    # A worker asked to stop no longer counts, so it is not asked again
+    autoscaler.step()
+    assert submitter.cancelled == ["1234_2"], submitter.cancelled
+    assert autoscaler.stopping == {1}, autoscaler.stopping
+
+
+def test_end_of_queue() -> None:
+    config.STOP_PATH = tempfile.mkdtemp() + "/"
+    queue = make_queue(sites=5, done=5, leased_by=[])
+    submitter = FakeSubmitter({})
+    autoscaler = Autoscaler(queue, submitter, deadline=time.time() + 3600, min_workers=2)  # type: ignore[arg-type]
+
+    autoscaler.step()
+    autoscaler.run(interval=0)  # Returns without sleeping
+
+    assert submitter.submitted == [], submitter.submitted
+    assert submitter.cancelled == [], submitter.cancelled
+
+
+if __name__ == "__main__":
+    test_start_from_empty_array()
+    test_scale_up()
+    test_scale_down()
+    test_end_of_queue()
+    print("All tests passed.")
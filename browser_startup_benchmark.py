@@ -0,0 +1,61 @@
+import argparse
+import shutil
+import statistics
+import time
+from typing import Optional
+
+from crawler import Crawler
+from utils.firefox_profile import build_template
+from utils.resources import process_tree_rss
+import config
+
+"""
+Benchmark browser startup time and memory with and without the template profile.
+
+For each trial, a web driver is launched and loads a page. Measures:
+1. Time from launching the web driver until the page is loaded.
+2. Resident memory of the Firefox process tree (parent and content processes) afterwards.
+"""
+
+
+def measure(template_profile: Optional[str], url: str, trials: int) -> tuple[list[float], list[int]]:
+    """
+    Return the startup time (seconds) and RSS (bytes) of each trial.
+    """
+    crawler = Crawler("browser-startup-benchmark", template_profile=template_profile)
+
+    times, rss = [], []
+    try:
+        for _ in range(trials):
+            start = time.time()
+            driver = crawler.launch_driver()
+            driver.get(url)
+            times.append(time.time() - start)
+
+            time.sleep(1)  # Let content processes settle
+            rss.append(process_tree_rss(driver.capabilities["moz:processID"]))
+            driver.quit()
+    finally:
+        shutil.rmtree(crawler.data_path, ignore_errors=True)
+
+    return times, rss
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark browser startup time and memory with and without the template profile.")
+    parser.add_argument("--trials", type=int, default=10)
+    parser.add_argument("--url", default="about:blank", help="Page to load after launching.")
+    parser.add_argument("--process-count", type=int, default=config.FIREFOX_PROCESS_COUNT)
+    args = parser.parse_args()
+
+    start = time.time()
+    template = build_template(args.process_count)
+    print(f"Template profile: '{template}' (ready in {time.time() - start:.1f} s)")
+    print()
+
+    for name, template_profile in [("default profile", None), ("template profile", template)]:
+        times, rss = measure(template_profile, args.url, args.trials)
+        print(
+            f"{name}: {statistics.median(times):.2f} s startup, "
+            f"{statistics.median(rss) / 1e6:.0f} MB RSS (median of {args.trials}), first {times[0]:.2f} s"
+        )
@@ -0,0 +1,87 @@
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Optional
+
+from crawler import Crawler
+from utils.capture import CapturePolicy
+from utils.resources import directory_size, process_tree_rss
+
+"""
+Benchmark seleniumwire request capture with and without a capture policy (see utils/capture.py).
+
+For each trial, a web driver loads each page, polls `driver.requests` as
+the crawler did before it tracked requests in flight with interceptors,
+and saves a HAR file. Measures:
+1. Time to load the pages, poll, and save the HAR file.
+2. Resident memory of the crawler process, which runs seleniumwire's proxy and holds captured requests.
+3. Resident memory of the crawler process tree, including the browser.
+4. Size of seleniumwire's temp files.
+"""
+
+POLLS = 20  # Polls of `driver.requests` per page
+
+
+def crawler_rss() -> int:
+    """
+    Return the resident memory (bytes) of this process only.
+    """
+    with open("/proc/self/status") as file:
+        for line in file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024  # Reported in kB
+    return 0
+
+
+def measure(policy: Optional[CapturePolicy], urls: list[str], trials: int) -> dict[str, list[float]]:
+    """
+    Return the time (seconds), crawler RSS, tree RSS, and temp size (bytes) of each trial.
+    """
+    temp_dir = tempfile.mkdtemp(prefix="capture-benchmark-")
+    tempfile.tempdir = temp_dir  # Where seleniumwire stores requests
+    crawler = Crawler("capture-benchmark", capture_policy=policy)
+
+    measurements: dict[str, list[float]] = {"time": [], "crawler_rss": [], "tree_rss": [], "temp_bytes": []}
+    try:
+        for _ in range(trials):
+            driver = crawler.launch_driver()
+            crawler.driver = driver
+
+            start = time.time()
+            for url in urls:
+                driver.get(url)
+                for _ in range(POLLS):
+                    sum(1 for request in driver.requests if request.response is None)
+            crawler.save_har(os.path.join(temp_dir, "benchmark.json.gz"))
+            measurements["time"].append(time.time() - start)
+
+            measurements["crawler_rss"].append(crawler_rss())
+            measurements["tree_rss"].append(process_tree_rss(os.getpid()))
+            measurements["temp_bytes"].append(directory_size(temp_dir))
+            driver.quit()
+    finally:
+        tempfile.tempdir = None
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        shutil.rmtree(crawler.data_path, ignore_errors=True)
+
+    return measurements
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark seleniumwire request capture with and without a capture policy.")
+    parser.add_argument("urls", nargs="+", help="Pages to load in each trial, e.g., heavy sites with video.")
+    parser.add_argument("--trials", type=int, default=3)
+    args = parser.parse_args()
+
+    # The capture policy runs first, since memory freed by Python is often not returned to the OS
+    for name, policy in [("capture policy", CapturePolicy.from_config() or CapturePolicy()), ("store everything", None)]:
+        measurements = measure(policy, args.urls, args.trials)
+        print(
+            f"{name}: {statistics.median(measurements['time']):.1f} s, "
+            f"crawler {statistics.median(measurements['crawler_rss']) / 1e6:.0f} MB RSS, "
+            f"total {statistics.median(measurements['tree_rss']) / 1e6:.0f} MB RSS, "
+            f"{statistics.median(measurements['temp_bytes']) / 1e6:.0f} MB temp files (median of {args.trials})"
+        )
@@ -1,16 +1,50 @@
+import os
+
 # https://tranco-list.eu/list/KJ2GW/1000000
-CRAWL_NAME = f"KJ2GW"  # Name of crawl
+CRAWL_NAME = os.getenv("CRAWL_NAME", "KJ2GW")  # Name of crawl. Overridden for sample crawls (see plan_crawl.py)
 SITE_LIST_PATH = "inputs/sites/KJ2GW.txt"  # Path to list of sites to crawl
 DEPTH = 0
-WAIT_TIME = 5
+WAIT_TIME = 5  # Maximum time (seconds) to wait for a page after loading it or clicking
+WAIT_SETTLE_TIME = None  # Seconds without DOM changes or in-flight requests after which a page is ready, e.g., 0.5 (None to always wait WAIT_TIME)
 
 TOTAL_ACTIONS = 50
 CLICKSTREAM_LENGTH = 10
 
+FIREFOX_TEMPLATE_PROFILE = True  # Clone each browser's profile from a pre-tuned template (see utils/firefox_profile.py)
+FIREFOX_PROCESS_COUNT = 2  # Maximum number of content processes per browser (dom.ipc.processCount)
+DRIVER_POOL_SIZE = 1  # Browsers kept launched in the background so the next arm starts immediately (0 to disable)
+COLLAPSE_ALIASES = False  # Record sites that resolve to an already crawled landing page as aliases instead of crawling them
+RESOURCE_POLICY = None  # Heavy resource types blocked in every arm, e.g. ("media", "font"). None to load all resources
+FAST_RESET = False  # Reset one browser between clickstream arms instead of relaunching (see fast_reset_test.py)
+BROWSER_MEMORY_BUDGET = None  # GB of browser RSS after which a clickstream ends early and the browser is replaced, e.g., 4 (None to disable)
+CAPTURE_POLICY = False  # Store bounded request data in seleniumwire, in memory up to a limit (see utils/capture.py). False to store everything on disk
+CAPTURE_BODY_TYPES = None  # Content type prefixes whose response bodies are stored, e.g. ["text/html", "application/json"] (None for all but media and fonts)
+CAPTURE_MAX_BODY_SIZE = 2  # MB of the largest response body stored (None for no limit)
+CAPTURE_MEMORY_LIMIT = 256  # MB of captured requests kept in memory per browser before spilling to disk (None for no limit)
+
 DATA_PATH = f"cookie-classify/{CRAWL_NAME}/"
 LOGGER_NAME = CRAWL_NAME
-RESULTS_PATH = DATA_PATH + "results.json"
-QUEUE_PATH = DATA_PATH + "queue.json"
+RESULTS_PATH = DATA_PATH + "results/"  # Append-only results log (see utils/results_log.py)
+QUEUE_PATH = DATA_PATH + "queue.sqlite"
+PREFILTER_PATH = DATA_PATH + "prefilter.json"  # Working URL variant of each site (see run_prefilter.py)
+ALIAS_INDEX_PATH = DATA_PATH + "aliases.sqlite"  # Resolved landing page of each crawled site (see utils/alias_index.py)
+STOP_PATH = DATA_PATH + "stop/"  # A file named after a worker ID asks that worker to exit before its next site (see autoscale.py)
 CONFIG_PATH = DATA_PATH + "config.yaml"
 
+QUEUE_VISIBILITY_TIMEOUT = 60 * 60  # Seconds before a leased site is returned to the queue
+QUEUE_MAX_ATTEMPTS = 3  # Leases before a site is marked as failed
+
+WORKER_START_METHOD = "forkserver"  # multiprocessing start method for crawl processes ("fork", "spawn", or "forkserver")
+
+HEARTBEAT_POLL_INTERVAL = 10  # Seconds between checks for crawler heartbeats
+STALL_TIMEOUT = 5 * 60  # Seconds without progress (a heartbeat with a new phase or action) before a site is stopped and requeued
+SITE_TIMEOUT = 2 * 60 * 60  # Maximum seconds per site, after which it is stopped and recorded as timed out (None for no limit)
+TERMINATE_TIMEOUT = 60  # Seconds to wait for a worker to exit after SIGTERM before sending SIGKILL
+
+# Only used by node_main.py
+NODE_MIN_AVAILABLE_MEMORY = 8  # GB of available memory required to start a site
+NODE_MAX_LOAD = 1.0  # Maximum 1-minute load average per CPU to start a site
+NODE_SETTLE_TIME = 30  # Seconds between site starts, so a new browser can allocate memory before the next check
+NODE_POLL_INTERVAL = 10  # Seconds between checks of worker status and node resources
+
 SLURM_LOG_PATH = "slurm_logs"
\ No newline at end of file
@@ -7,8 +7,10 @@ from pathlib import Path
 import yaml
 import matplotlib.pyplot as plt
 import matplotlib as mpl
-from filelock import FileLock
 from crawler import CrawlResults
+from utils.har import har_path, iter_har_entries
+from utils.results_log import read_results
+from utils.work_queue import read_domains
 from utils.utils import get_directories, get_domain, split
 from utils.image_shingle import ImageShingle
 import time
@@ -31,16 +33,10 @@ with open(config["SITE_LIST_PATH"]) as file:
         site_list.append(line.strip())
 
 # Site queue
-queue_lock = FileLock(config["QUEUE_PATH"] + ".lock", timeout=60)
-with queue_lock:
-    with open(config["QUEUE_PATH"], "r") as file:
-        site_queue = json.load(file)
+site_queue = read_domains(config["QUEUE_PATH"])
 
 # Site results
-results_lock = FileLock(config["RESULTS_PATH"] + ".lock", timeout=60)
-with results_lock:
-    with open(config["RESULTS_PATH"]) as file:
-        site_results: dict[str, CrawlResults] = json.load(file)
+site_results: dict[str, CrawlResults] = read_results(config["RESULTS_PATH"])
 
 """
 Check crawl completion.
@@ -53,6 +49,7 @@ A successful site must have:
 1. a successful domain -> url resolution
 3. was not terminated via SIGKILL
 2. no unexpected crawl exceptions
+4. was crawled itself rather than recorded as an alias of another site
 """
 successful_sites = []
 unsuccessful_sites = []
@@ -63,6 +60,7 @@ for domain, result in site_results.items():
         result.get("url")
         and not result.get("SIGKILL")
         and not result.get("unexpected_exception")
+        and not result.get("alias_of")
     ):
         successful_sites.append(domain)
     else:
@@ -106,22 +104,19 @@ def count_easylist_requests(sites: list, trackers) -> dict:
         logger.info(f"Analyzing {domain} ({i+1}/{len(sites)}).")
 
         # Take baseline har file from first clickstream
-        har_path = Path(site_results[domain]["data_path"]) / "1" / "baseline.json"
-
-        if har_path.is_file():
-            with open(har_path) as data:
-                try:
-                    har = json.load(data)
-                except json.JSONDecodeError:
-                    logger.exception(f"Failed to read {har_path}.")
+        path = har_path(str(Path(site_results[domain]["data_path"]) / "1" / "baseline"))
+        if not os.path.isfile(path):
+            continue
 
         res[domain] = 0
-        entries = har["log"]["entries"]
-        for entry in entries:
-            if resquest := entry.get("request"):
-                if url := resquest.get("url"):
-                    if get_domain(url) in trackers:
-                        res[domain] += 1
+        try:
+            for entry in iter_har_entries(path):
+                if resquest := entry.get("request"):
+                    if url := resquest.get("url"):
+                        if get_domain(url) in trackers:
+                            res[domain] += 1
+        except (json.JSONDecodeError, EOFError):
+            logger.exception(f"Failed to read {path}.")
 
     return res
 
@@ -1,3 +1,4 @@
+import datetime
 import functools
 from collections import deque
 from collections.abc import Callable
@@ -29,15 +30,21 @@ from selenium.common.exceptions import (
     UnexpectedAlertPresentException
 )
 
-import bannerclick.bannerdetection as bc
-
+from utils.alias_index import AliasIndex
+from utils.capture import BoundedStorage, CapturePolicy, stored_har_entries
 from utils.cookie_database import CookieClass
+from utils.driver_pool import DriverPool
+from utils.firefox_profile import clone_template
+from utils.har import write_har
+from utils.resources import process_tree_rss
 import utils.interceptors as interceptors
 import utils.utils as utils
 from utils.utils import log
 from utils.url import URL
 import config
 
+CHECKPOINT_FILE = "checkpoint.json"  # Name of the checkpoint file in a domain's data path
+
 
 class BannerClick(str, Enum):
     """
@@ -71,6 +78,48 @@ class CMP(str, Enum):
     TCF = "__tcfapi"
 
 
+class GetFailure(str, Enum):
+    """
+    Type of failure to get a URL.
+    See Crawler.classify_failure for definitions.
+    """
+
+    DNS = "dns"
+    CONNECTION_REFUSED = "connection_refused"
+    TLS = "tls"
+    SLOW = "slow"
+    EMPTY = "empty"
+    OTHER = "other"
+
+
+# Patterns in proxy and browser error messages, in order of precedence
+GET_FAILURE_PATTERNS = {
+    GetFailure.DNS: [
+        "dnsNotFound",
+        "Name or service not known",
+        "nodename nor servname",
+        "No address associated with hostname",
+        "Name does not resolve",
+        "Temporary failure in name resolution",
+        "getaddrinfo failed",
+    ],
+    GetFailure.CONNECTION_REFUSED: [
+        "connectionFailure",
+        "Connection refused",
+        "ConnectionRefusedError",
+    ],
+    GetFailure.TLS: [
+        "nssFailure",
+        "secureConnectionFailed",
+        "SSLError",
+        "TlsException",
+        "TLS handshake",
+        "handshake failure",
+        "certificate verify failed",
+    ],
+}
+
+
 class LandingPageDown(Exception):
     """
     This exception is raised when the landing page is down.
@@ -83,12 +132,29 @@ class LandingPageDown(Exception):
     """
     pass
 
+class CrawlInterrupted(Exception):
+    """
+    This exception is raised to stop a crawl that will be requeued (e.g., from a heartbeat callback).
+    @crawl_algo catches this exception and records the crawl as interrupted rather than failed.
+    classification_algo keeps the checkpoint, so that the requeued crawl resumes.
+    """
+    pass
+
 class UrlDown(Exception):
     """
     This exception is raised in self.get if the URL cannot be accessed.
     
     If appropriate, this exception should be escalated to LandingPageDown.
     """
+
+    def __init__(self, failure: Optional[GetFailure] = None) -> None:
+        super().__init__(failure)
+        self.failure = failure
+
+class BrowserStateNotEmpty(Exception):
+    """
+    This exception is raised in self.reset_driver if site data remains after clearing the browser state.
+    """
     pass
 
 class CrawlResults(TypedDict, total=False):
@@ -100,10 +166,32 @@ class CrawlResults(TypedDict, total=False):
     data_path: str  # Where the crawl data is stored
     landing_page_down: bool  # True/False if landing page is down/up, None if not attempted
     unexpected_exception: bool  # True iff an unexpected exception occurred
-    total_time: int  # Time (seconds) to crawl the website
+    total_time: float  # Time (seconds) to crawl the website
     SLURM_ARRAY_TASK_ID: int  # Set by main.py
     SIGTERM: bool  # If process was sent SIGTERM by main.py
     SIGKILL: bool  # If process was sent SIGKILL by main.py
+    interrupted: bool  # If the crawl was stopped to be requeued and resumed from its checkpoint (see CrawlInterrupted)
+    stalled: bool  # If main.py stopped the process because it stopped making progress (see STALL_TIMEOUT)
+    timed_out: bool  # If main.py stopped the process at the time limit per site (see SITE_TIMEOUT)
+    driver_pool: dict[str, float]  # Driver pool metrics (see DriverPool.stats). Only set if a driver pool is used
+    fast_resets: int  # Number of arms that reused a reset browser. Only set in fast reset mode
+    fast_reset_failures: int  # Number of failed resets, each followed by a fresh launch. Only set in fast reset mode
+    memory_recycles: int  # Number of clickstream arms ended early because the browser exceeded its memory budget
+    prefiltered: bool  # If the site was marked down by run_prefilter.py without starting a browser
+    resource_policy: Optional[list[str]]  # Resource types blocked in every arm (see interceptors.block_resources_interceptor). None if not blocked
+    resource_policy_hits: dict[str, int]  # Number of blocked requests of each resource type
+    offdomain_clicks: int  # Number of clicks that navigated off the site's domain, which were cancelled or undone
+    capture: dict[str, int]  # Response bodies and bytes not stored, requests spilled to disk, and peak bytes of captured requests in memory (see utils/capture.py). Only set with a capture policy
+    alias_of: str  # Domain that resolved to the same landing page first. Set instead of crawling the site again (see utils/alias_index.py)
+    landing_page_probe: dict[str, Any]  # Health probe of the resolved landing page (see injections/health-probe.js)
+    resolution_failures: dict[str, Optional[GetFailure]]  # Failure type of each URL tried before the domain resolved (see resolve_domain)
+    ready_waits: dict[str, float]  # Number of readiness waits, total time waited, and total time of the same number of fixed waits
+
+    # Only set by main.py (see utils/process_group.py)
+    peak_rss: int  # Peak resident memory (bytes) of the crawl process and its browsers
+    cpu_time: float  # CPU time (seconds) of the crawl process and its browsers
+    peak_temp_bytes: int  # Peak size (bytes) of the crawl's temp directory (profiles, seleniumwire storage)
+    orphans_killed: int  # Number of processes left after the crawl process exited
 
     # Only set during compliance_algo
     cmp_names: Optional[set[CMP]]  # Empty if no CMPs found, None if CMP detection not attempted
@@ -117,6 +205,18 @@ class CrawlResults(TypedDict, total=False):
     traversal_failures: dict[ClickableElement, int] # Number of click failures for each type of click
 
 
+class Heartbeat(TypedDict):
+    """
+    Progress report sent by a crawler to its supervisor.
+    """
+
+    time: float  # Time (seconds since epoch) the heartbeat was sent
+    phase: str  # Current phase of the crawl (e.g., "resolve", "baseline", "control", "experimental")
+    clickstream: int  # Current clickstream ID
+    action: Optional[int]  # Current action within the clickstream, None if not in a clickstream
+    actions: int  # Number of actions completed across all clickstreams
+
+
 class CrawlDataEncoder(json.JSONEncoder):
     """
     Class for encoding CrawlData as JSON.
@@ -139,7 +239,25 @@ class Crawler:
 
     logger = logging.getLogger(config.LOGGER_NAME)
 
-    def __init__(self, domain: str, wait_time: int = 5, total_get_attempts: int = 3, page_load_timeout: int = 60, headless: bool = True) -> None:
+    def __init__(
+            self,
+            domain: str,
+            wait_time: int = 5,
+            total_get_attempts: int = 3,
+            page_load_timeout: int = 60,
+            headless: bool = True,
+            heartbeat: Optional[Callable[[Heartbeat], None]] = None,
+            resume: bool = False,
+            driver_pool_size: int = 0,
+            template_profile: Optional[str] = None,
+            fast_reset: bool = False,
+            memory_budget: Optional[float] = None,
+            settle_time: Optional[float] = None,
+            url_hint: Optional[str] = None,
+            alias_index: Optional[AliasIndex] = None,
+            resource_policy: Optional[tuple[str, ...]] = None,
+            capture_policy: Optional[CapturePolicy] = None,
+    ) -> None:
         """
         Args:
             crawl_url: The URL of the website to crawl.
@@ -147,6 +265,24 @@ class Crawler:
             total_get_attempts: Number of attempts to get a website. Defaults to 3.
             page_load_timeout: Time to wait for a page to load. Defaults to 60 seconds.
             headless: Whether to run the web driver in headless mode. Defaults to True.
+            heartbeat: Called with a Heartbeat whenever the crawl makes progress. Defaults to None, where no heartbeats are sent.
+            resume: Whether to resume from the checkpoint of an interrupted crawl if one exists. Defaults to False.
+            driver_pool_size: Number of web drivers to keep launched in the background. Defaults to 0, where drivers are launched on demand.
+            template_profile: Path of a template Firefox profile to clone for each web driver (see utils/firefox_profile.py).
+                Defaults to None, where each web driver creates a default profile.
+            fast_reset: Whether to reset one browser between the arms of classification_algo instead of launching a new browser for each arm.
+                Falls back to launching a new browser if a reset fails. Defaults to False.
+            memory_budget: Maximum resident memory (GB) of the browser. Past the budget, the current clickstream ends
+                at the next action and the next clickstream starts in a new browser. Defaults to None, where memory is not checked.
+            settle_time: Time (seconds) without in-flight requests or DOM changes after which a page is ready (see wait_until_ready).
+                Defaults to None, where the crawler always waits `wait_time`.
+            url_hint: URL variant of the domain known to work (see run_prefilter.py), tried first by resolve_domain. Defaults to None.
+            alias_index: Crawl-wide index of resolved URLs. If given, classification_algo skips domains that resolve
+                to a URL already claimed by another domain, and claims the URL once its crawl completes. Defaults to None.
+            resource_policy: Heavy resource types ("media", "font") to block identically in every arm of
+                crawl_clickstream. Defaults to None, where all resources are loaded.
+            capture_policy: What seleniumwire stores of each request in the web drivers (see utils/capture.py).
+                Defaults to None, where everything is stored on disk.
         """
         self.start_time = time.time()
 
@@ -163,7 +299,9 @@ class Crawler:
 
         # Where the crawl data is stored
         self.data_path = f"{config.DATA_PATH}{domain}/"
-        pathlib.Path(self.data_path).mkdir(parents=True, exist_ok=False)
+        self.checkpoint_path = self.data_path + CHECKPOINT_FILE
+        resume = resume and Path(self.checkpoint_path).is_file()
+        pathlib.Path(self.data_path).mkdir(parents=True, exist_ok=resume)
 
         # Each URL is assigned a unique ID
         self.uids: dict[Any, int] = {}
@@ -172,6 +310,11 @@ class Crawler:
         # Each clickstream is assigned a unique ID
         self.clickstream = 1
 
+        # Progress reporting
+        self.heartbeat_callback = heartbeat
+        self.phase = "start"
+        self.current_actions = 0
+
         self.results: CrawlResults = {
             "url": None,
             "data_path": self.data_path,
@@ -191,7 +334,121 @@ class Crawler:
             }
         }
 
+        self.resumed = False
+        if resume:
+            self.load_checkpoint()
+
+        self.template_profile = template_profile
+
+        # Whether self.driver is a HAR-enabled browser that can be reset for the next arm
+        self.fast_reset = fast_reset
+        self.reusable_driver = False
+        if fast_reset:
+            self.results["fast_resets"] = 0
+            self.results["fast_reset_failures"] = 0
+
+        # Whether the browser exceeded its memory budget during the current arm
+        self.memory_budget = memory_budget
+        self.memory_exceeded = False
+        self.results["memory_recycles"] = 0
+
+        self.settle_time = settle_time
+
+        self.url_hint = url_hint
+        self.alias_index = alias_index
+
+        unknown_types = set(resource_policy or ()) - set(interceptors.RESOURCE_EXTENSIONS)
+        if unknown_types:
+            raise ValueError(f"Resource types {sorted(unknown_types)} cannot be blocked. Choose from {list(interceptors.RESOURCE_EXTENSIONS)}.")
+        self.resource_policy = resource_policy
+        self.results["resource_policy"] = list(resource_policy) if resource_policy else None
+        self.results["resource_policy_hits"] = {}
+
+        # Domain that top-level navigations are restricted to in crawl_clickstream, and the cancelled navigations
+        self.navigation_guard: Optional[str] = None
+        self.blocked_navigations: list[str] = []
+        self.results["offdomain_clicks"] = 0
+
+        self.capture_policy = capture_policy
+        if capture_policy is not None:
+            self.results["capture"] = {}
+
+        # Health probe of the last page loaded by self.get
+        self.last_probe: dict[str, Any] = {}
+        self.results["ready_waits"] = {"count": 0, "time": 0.0, "cap_time": 0.0}
+
+        # geckodriver processes of all launched drivers, so a supervisor can kill their leftover browsers
+        self.browser_pids: list[int] = []
+
+        self.driver_pool: Optional[DriverPool] = None
+        if driver_pool_size > 0:
+            self.driver_pool = DriverPool(self.launch_driver, size=driver_pool_size)
+
+    def save_checkpoint(self) -> None:
+        """
+        Save the progress of classification_algo so an interrupted crawl can be resumed.
+
+        Only completed clickstreams are included.
+        """
+        checkpoint = {
+            "url": self.url,
+            "clickstream": self.clickstream,
+            "current_actions": self.current_actions,
+            "results": self.results,
+        }
+
+        # Write atomically so a killed worker never leaves a partial checkpoint
+        temp_path = self.checkpoint_path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(checkpoint, file, cls=CrawlDataEncoder)
+        Path(temp_path).replace(self.checkpoint_path)
+
+    def load_checkpoint(self) -> None:
+        """
+        Restore the progress of classification_algo from the checkpoint.
+
+        Data from the interrupted clickstream (and any after it) is deleted.
+        """
+        with open(self.checkpoint_path) as file:
+            checkpoint = json.load(file)
+
+        self.url = checkpoint["url"]
+        self.clickstream = checkpoint["clickstream"]
+        self.current_actions = checkpoint["current_actions"]
+
+        # Restore types lost in JSON serialization
+        results = checkpoint["results"]
+        results["clickstream"] = [
+            [(action, ClickableElement(element_type)) for action, element_type in clickstream]
+            for clickstream in results["clickstream"]
+        ]
+        results["traversal_failures"] = {ClickableElement(k): v for k, v in results["traversal_failures"].items()}
+        results["data_path"] = self.data_path
+        self.results = results
+
+        for path in Path(self.data_path).iterdir():
+            if path.is_dir() and path.name.isdigit() and int(path.name) >= self.clickstream:
+                shutil.rmtree(path)
+
+        self.resumed = True
+        Crawler.logger.info(f"Resuming '{self.domain}' from clickstream {self.clickstream} ({self.current_actions} actions completed).")
+
     def get_driver(self, enable_har: bool = True) -> webdriver.Firefox:
+        """
+        Return a Firefox web driver with a fresh profile.
+
+        HAR-enabled drivers are taken from the driver pool if there is one.
+        Requests are captured according to self.capture_policy (see utils/capture.py).
+
+        Args:
+            enable_har: Whether to enable HAR logging. Defaults to True.
+        """
+        if enable_har and self.driver_pool is not None:
+            return self.driver_pool.acquire()
+
+        return self.launch_driver(enable_har)
+
+    def launch_driver(self, enable_har: bool = True) -> webdriver.Firefox:
         """
         Initialize and return a Firefox web driver using arguments from self.
 
@@ -209,17 +466,164 @@ class Crawler:
         if self.headless:
             options.add_argument("--headless")
 
-        seleniumwire_options = {
+        if self.fast_reset:
+            options.add_argument("-remote-allow-system-access")  # Chrome context, used by reset_driver
+
+        seleniumwire_options: dict[str, Any] = {
             'enable_har': enable_har,
         }
+        if self.capture_policy is not None:
+            seleniumwire_options['request_storage'] = 'memory'  # Wrapped in BoundedStorage below
 
-        firefox_profile = webdriver.FirefoxProfile()  # by default, will create a fresh profile
+        if self.template_profile is None:
+            firefox_profile = webdriver.FirefoxProfile()  # by default, will create a fresh profile
+            driver = webdriver.Firefox(options=options, seleniumwire_options=seleniumwire_options, firefox_profile=firefox_profile)
+        else:
+            # geckodriver uses a profile passed with -profile in place instead of copying it
+            profile_path = clone_template(self.template_profile)
+            options.add_argument("-profile")
+            options.add_argument(profile_path)
+            try:
+                driver = webdriver.Firefox(options=options, seleniumwire_options=seleniumwire_options)
+            except Exception:
+                shutil.rmtree(profile_path, ignore_errors=True)
+                raise
+
+            quit_driver = driver.quit
+            def quit_and_remove_profile() -> None:
+                try:
+                    quit_driver()
+                finally:
+                    shutil.rmtree(profile_path, ignore_errors=True)
+            driver.quit = quit_and_remove_profile  # type: ignore[method-assign]
+
+        self.browser_pids.append(driver.service.process.pid)
+
+        # Counts requests in flight for wait_until_ready. Only installed with a settle time,
+        # since it intercepts every request and response (see install_request_interceptor)
+        if self.settle_time is not None:
+            driver.request_tracker = interceptors.RequestTracker()  # type: ignore[attr-defined]
+            driver.request_tracker.install(driver)  # type: ignore[attr-defined]
+
+        if self.capture_policy is not None:
+            driver.backend.storage = BoundedStorage(driver.backend.storage, self.capture_policy, self.results["capture"])
 
-        driver = webdriver.Firefox(options=options, seleniumwire_options=seleniumwire_options, firefox_profile=firefox_profile)
         driver.set_page_load_timeout(self.page_load_timeout)
 
         return driver
 
+    def browser_state(self) -> dict[str, Any]:
+        """
+        Return the amount of site data stored by the browser (see injections/browser-state.js).
+        """
+        with self.driver.context(self.driver.CONTEXT_CHROME):
+            return self.inject_script("injections/browser-state.js", asynchronous=True)
+
+    def reset_driver(self) -> None:
+        """
+        Clear all browser state so the current browser can be reused like a fresh one.
+
+        Closes all but one window, clears cookies, DOM storage, service workers, and caches,
+        and starts a new HAR log.
+
+        Raises:
+            BrowserStateNotEmpty: If any site data remains after clearing.
+        """
+        handles = self.driver.window_handles
+        for handle in handles[1:]:
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+        self.driver.switch_to.window(handles[0])
+        self.driver.get("about:blank")
+
+        with self.driver.context(self.driver.CONTEXT_CHROME):
+            failed = self.inject_script("injections/clear-browser-state.js", asynchronous=True)
+
+        state = self.browser_state()
+        if failed or "error" in state or any(state.values()):
+            raise BrowserStateNotEmpty(f"Browser state not empty after reset (failed flags {failed}): {state}.")
+
+        del self.driver.requests  # Start a new HAR log
+        self.install_request_interceptor(None)
+        if self.settle_time is not None:
+            self.driver.request_tracker.clear()
+
+    def install_request_interceptor(self, interceptor: Optional[Callable[[seleniumwire.request.Request], None]]) -> None:
+        """
+        Set the request interceptor of the current web driver, or remove it if `interceptor` is None.
+
+        With a settle time, the driver's RequestTracker is its interceptor and calls `interceptor`.
+        """
+        if self.settle_time is not None:
+            self.driver.request_tracker.interceptor = interceptor
+        elif interceptor is not None:
+            self.driver.request_interceptor = interceptor
+        else:
+            del self.driver.request_interceptor
+
+    def start_arm(self) -> None:
+        """
+        Set self.driver to a browser with a clean state for the next arm of a clickstream.
+
+        In fast reset mode, the previous browser is reset if possible. Otherwise, a new browser is launched.
+        """
+        self.memory_exceeded = False
+
+        if self.fast_reset and self.reusable_driver:
+            try:
+                self.reset_driver()
+                self.results["fast_resets"] += 1
+                return
+            except (WebDriverException, BrowserStateNotEmpty):
+                Crawler.logger.warning("Failed to reset browser. Launching a new browser...", exc_info=True)
+                self.results["fast_reset_failures"] += 1
+                self.driver.quit()
+
+        self.driver = self.get_driver()
+        self.reusable_driver = self.fast_reset
+
+    def end_arm(self) -> None:
+        """
+        Quit the browser after an arm of a clickstream, unless it will be reset for the next arm.
+
+        A browser that exceeded its memory budget is always quit.
+        """
+        if not self.fast_reset or self.memory_exceeded:
+            self.driver.quit()
+            self.reusable_driver = False
+
+    def browser_rss(self) -> int:
+        """
+        Return the resident memory (bytes) of the browser, including its content processes.
+        """
+        return process_tree_rss(int(self.driver.capabilities["moz:processID"]))
+
+    def over_memory_budget(self) -> bool:
+        """
+        Return True iff the browser has exceeded the memory budget.
+        """
+        if self.memory_budget is None:
+            return False
+
+        rss = self.browser_rss()
+        if rss <= self.memory_budget * 1024**3:
+            return False
+
+        Crawler.logger.warning(f"Browser is using {rss / 1024**3:.2f} GB, more than the budget of {self.memory_budget} GB.")
+        return True
+
+    def close_driver_pool(self) -> None:
+        """
+        Quit all pooled drivers and record pool metrics. Does nothing if the pool is already closed.
+        """
+        if self.driver_pool is None:
+            return
+
+        self.driver_pool.close()
+        self.results["driver_pool"] = self.driver_pool.stats()
+        Crawler.logger.info(f"Driver pool: {self.results['driver_pool']}.")
+        self.driver_pool = None
+
     @staticmethod
     def crawl_algo(func: Callable[..., None]) -> Callable[..., CrawlResults]:
         """
@@ -234,16 +638,43 @@ class Crawler:
             except LandingPageDown:
                 Crawler.logger.warning(f"Landing page is down for '{self.domain}'.")
                 self.results["landing_page_down"] = True
+            except CrawlInterrupted as e:
+                Crawler.logger.warning(f"Crawl of '{self.domain}' was interrupted ({e}). Keeping its checkpoint.")
+                self.results["interrupted"] = True
             except Exception:  # skipcq: PYL-W0703
                 Crawler.logger.critical(f"Unexpected exception for '{self.domain}'.", exc_info=True)
                 self.results["unexpected_exception"] = True
 
-            self.driver.quit()
+            if hasattr(self, "driver"):  # Not set if the crawl failed before launching a browser
+                self.driver.quit()
+            self.close_driver_pool()
 
             return self.results
 
         return wrapper
 
+    def heartbeat(self, phase: Optional[str] = None, action: Optional[int] = None) -> None:
+        """
+        Report progress to the supervisor.
+
+        Args:
+            phase: New phase of the crawl. Defaults to None, where the current phase is kept.
+            action: Current action within the clickstream. Defaults to None.
+        """
+        if phase is not None:
+            self.phase = phase
+
+        if self.heartbeat_callback is None:
+            return
+
+        self.heartbeat_callback({
+            "time": time.time(),
+            "phase": self.phase,
+            "clickstream": self.clickstream,
+            "action": action,
+            "actions": self.current_actions,
+        })
+
     def get_clickable_elements(self) -> list[tuple[str, str]]:
         """
         Get all clickable elements on the current page.
@@ -265,6 +696,8 @@ class Crawler:
         """
         Get the website at the given URL with multiple reattempts.
 
+        Failures that cannot succeed on a retry (see `is_retryable`) are not reattempted.
+
         Args:
             url: The URL of the website to get.
 
@@ -276,41 +709,150 @@ class Crawler:
         """
         # Visit the url with reattempts
         for attempt in range(self.total_get_attempts):
+            self.heartbeat()
+            start = time.time()
             try:
                 # Attempt to get the website
                 self.driver.get(url)
-                time.sleep(self.wait_time)
-                break  # If successful, break out of the loop
+                failure = self.classify_failure(since=start, url=url)
+                if failure is None:
+                    self.wait_until_ready(start)
+                    break  # If successful, break out of the loop
 
+                Crawler.logger.warning(f"Failed get attempt {attempt+1}/{self.total_get_attempts} for '{url}' ({failure.value}).")
             except TimeoutException:
-                Crawler.logger.warning(f"Failed get attempt {attempt+1}/{self.total_get_attempts} for '{url}'.")
-            except Exception:
-                Crawler.logger.warning(f"Failed get attempt {attempt+1}/{self.total_get_attempts} for '{url}'.", exc_info=True)
+                failure = GetFailure.SLOW
+                Crawler.logger.warning(f"Failed get attempt {attempt+1}/{self.total_get_attempts} for '{url}' ({failure.value}).")
+            except Exception as e:
+                failure = self.classify_failure(since=start, url=url, error=e) or GetFailure.OTHER
+                Crawler.logger.warning(f"Failed get attempt {attempt+1}/{self.total_get_attempts} for '{url}' ({failure.value}).", exc_info=True)
+
+            if not self.is_retryable(failure):
+                raise UrlDown(failure)
 
             if attempt < self.total_get_attempts - 1:
                 time.sleep(self.wait_time)
         else:
             # Unable to get the website after all attempts
-            raise UrlDown()
-
-        # If there are no clickable elements, the website is down
-        selectors: list[tuple[str, str]] = self.get_clickable_elements()
-        if len(selectors) == 0:
-            raise UrlDown()
+            raise UrlDown(failure)
+
+        # Check that the page is up without extracting clickable elements.
+        # The parked and error page signals are heuristics, so they are recorded (see resolve) rather than raised.
+        self.last_probe = self.inject_script("injections/health-probe.js")
+        for signal in ("parked", "errorPage", "challenge"):
+            if self.last_probe[signal]:
+                Crawler.logger.info(f"Health probe of '{url}' found signal '{signal}'.")
+
+        # If there are no clickable elements, the website is down.
+        # Only pages without visible links or buttons need the full extraction, which also finds elements with a pointer cursor.
+        if self.last_probe["clickableCount"] == 0 and len(self.get_clickable_elements()) == 0:
+            raise UrlDown(GetFailure.EMPTY)
         
         return self.driver.current_url
 
+    def main_document(self, since: float, url: Optional[str] = None) -> Optional[seleniumwire.request.Request]:
+        """
+        Return the last top-level document request made since `since` (seconds since epoch), as seen by the proxy.
+
+        After redirects, this is the request for the final page.
+        Firefox does not send Sec-Fetch-Dest to HTTP (non-HTTPS) URLs. Without it, the last request for `url` is returned.
+        """
+        since_date = datetime.datetime.fromtimestamp(since)
+        requests = [request for request in self.driver.requests if request.date >= since_date]
+
+        documents = [request for request in requests if request.headers.get("Sec-Fetch-Dest") == "document"]
+        if not documents and url is not None:
+            documents = [request for request in requests if request.url.rstrip("/") == url.rstrip("/")]
+        return documents[-1] if documents else None
+
+    def classify_failure(self, since: float, url: Optional[str] = None, error: Optional[Exception] = None) -> Optional[GetFailure]:
+        """
+        Classify a failed page load from the proxy's view of the main document request.
+
+        Args:
+            since: Time (seconds since epoch) the page load started.
+            url: URL that was loaded. Defaults to None.
+            error: Exception raised by the web driver, if any. Defaults to None.
+
+        A page that the server responded to loaded, whatever its status: error statuses include
+        bot challenges (e.g., 403 and 503) that are crawled like any other page.
+
+        Returns:
+            GetFailure.DNS, GetFailure.CONNECTION_REFUSED, or GetFailure.TLS if the proxy or browser reported such an error.
+            GetFailure.OTHER if the main document got no response for another reason.
+            None if the page loaded successfully.
+        """
+        document = self.main_document(since, url)
+        if document is not None and document.response is not None:
+            status = document.response.status_code
+            if status != 502:  # The proxy reports connection errors as 502
+                if status >= 400:
+                    Crawler.logger.info(f"Main document responded with status {status}.")
+                return None
+
+        # No response from the server. The reason is in the proxy's error page or the browser's error page,
+        # which are the only pages searched, since a loaded page may contain the same text.
+        messages = [str(error) if error is not None else ""]
+        if document is not None and document.response is not None:
+            messages.append(document.response.reason)
+            messages.append(document.response.body.decode("utf-8", errors="replace"))
+        try:
+            current_url = self.driver.current_url
+            messages.append(current_url)  # E.g., about:neterror?e=dnsNotFound
+            if current_url.startswith(("about:neterror", "about:certerror")):
+                messages.append(self.driver.page_source)
+        except WebDriverException:
+            pass
+        message = "\n".join(messages)
+
+        for failure, patterns in GET_FAILURE_PATTERNS.items():
+            if any(pattern in message for pattern in patterns):
+                return failure
+
+        if document is None and error is None:
+            return None  # Not seen by the proxy (e.g., about: URLs)
+        return GetFailure.OTHER
+
+    @staticmethod
+    def is_retryable(failure: GetFailure) -> bool:
+        """
+        Return True iff a get that failed with `failure` may succeed when reattempted.
+
+        Only network errors before any response (DNS, connection, and TLS failures) are not reattempted.
+        """
+        return failure not in (GetFailure.DNS, GetFailure.CONNECTION_REFUSED, GetFailure.TLS)
+
     def resolve_domain(self, domain: str) -> str:
         """
         Resolve a domain to a URL.
 
+        The URL hint is tried first, if there is one. URL variants whose host failed DNS resolution are skipped.
+
         Args:
             domain: The domain to resolve.
         """
-        for url in [f"https://{domain}", f"https://www.{domain}", f"http://{domain}", f"http://www.{domain}"]:
+        self.results["resolution_failures"] = {}
+        unresolvable_hosts: set[str] = set()
+
+        urls = [f"https://{domain}", f"https://www.{domain}", f"http://{domain}", f"http://www.{domain}"]
+        if self.url_hint is not None:
+            urls = [self.url_hint] + [url for url in urls if url != self.url_hint]
+
+        for url in urls:
+            host = url.split("://")[1]
+            if host in unresolvable_hosts:
+                self.results["resolution_failures"][url] = GetFailure.DNS
+                continue
+
             try:
-                return self.get(url)
-            except UrlDown:
+                resolved_url = self.get(url)
+                self.results["landing_page_probe"] = self.last_probe
+                return resolved_url
+            except UrlDown as e:
+                Crawler.logger.info(f"Failed to resolve '{domain}' with '{url}' ({e.failure.value if e.failure else 'unknown'}).")
+                self.results["resolution_failures"][url] = e.failure
+                if e.failure == GetFailure.DNS:
+                    unresolvable_hosts.add(host)
                 continue
         
         raise LandingPageDown()
@@ -409,7 +951,7 @@ class Crawler:
 
             return
 
-    # @crawl_algo
+    @crawl_algo
     def classification_algo(self, total_actions: int = 50, clickstream_length: int = 10):
         """
         Cookie classification algorithm.
@@ -417,63 +959,102 @@ class Crawler:
         Args:
             trials: Number of clickstreams to generate. Defaults to 10.
             length: Length of each clickstream. Defaults to 5.
-        """
-
-        # Domain -> URL Resolution
-        self.driver = self.get_driver(enable_har=False)
-        self.url = self.resolve_domain(self.domain)
-        self.results["url"] = self.url
-        self.logger.info(f"Resolved domain '{self.domain}' to '{self.url}'.")
-        self.driver.quit()
 
-        # Classification Algorithm
-        current_actions = 0
-        while current_actions < total_actions:
-            try:
-                clickstream_path = self.data_path + f"{self.clickstream}/"
-                Path(clickstream_path).mkdir(parents=True)
-
-                self.driver = self.get_driver()
-                clickstream = self.crawl_clickstream(
-                    clickstream=None,
-                    clickstream_length=clickstream_length,
-                    crawl_name="baseline",
-                    set_request_interceptor=False,
-                )
-                self.save_har(clickstream_path + "baseline.json")
-                self.driver.quit()
-
-                self.results["clickstream"].append(clickstream)
+        Returns:
+            The results of the crawl (see @crawl_algo).
+        """
 
-                # Control group
-                self.driver = self.get_driver()
-                control_clickstream = self.crawl_clickstream(
-                    clickstream=clickstream,
-                    clickstream_length=clickstream_length,
-                    crawl_name="control",
-                    set_request_interceptor=False,
-                )
-                current_actions += len(control_clickstream) + 1 # We add one since we count just getting the website as an action
-                self.save_har(clickstream_path + "control.json")
+        # The pool launches browsers in the background, which must be quit however the crawl ends
+        interrupted = False
+        try:
+            # Domain -> URL Resolution
+            if not self.resumed:
+                self.heartbeat("resolve")
+                self.driver = self.get_driver(enable_har=False)
+                self.url = self.resolve_domain(self.domain)
+                self.results["url"] = self.url
+                self.logger.info(f"Resolved domain '{self.domain}' to '{self.url}'.")
                 self.driver.quit()
 
-                # Experimental group
-                self.driver = self.get_driver()
-                self.crawl_clickstream(
-                    clickstream=clickstream,
-                    clickstream_length=clickstream_length, # No need to traverse more than the control group
-                    crawl_name="experimental",
-                    set_request_interceptor=True,
-                )
-                self.save_har(clickstream_path + "experimental.json")
-                self.driver.quit()
-            except (InvalidSessionIdException, WebDriverException, JavascriptException, UnexpectedAlertPresentException) as e:
-                Crawler.logger.error(f"Driver encountered {type(e).__name__}. Restarting...", exc_info=True)
-                self.driver.quit()
-            finally:
-                Crawler.logger.info(f"Data collected for {current_actions}/{total_actions} actions.")
-                self.clickstream += 1
+                # Do not crawl the same landing page twice
+                if self.alias_index is not None:
+                    alias_of = self.alias_index.owner(self.url)
+                    if alias_of is not None:
+                        Crawler.logger.info(f"'{self.url}' was already crawled for '{alias_of}'. Recording '{self.domain}' as an alias.")
+                        self.results["alias_of"] = alias_of
+                        return
 
+            # Classification Algorithm
+            while self.current_actions < total_actions:
+                try:
+                    clickstream_path = self.data_path + f"{self.clickstream}/"
+                    Path(clickstream_path).mkdir(parents=True)
+
+                    self.heartbeat("baseline")
+                    self.start_arm()
+                    clickstream = self.crawl_clickstream(
+                        clickstream=None,
+                        clickstream_length=clickstream_length,
+                        crawl_name="baseline",
+                        set_request_interceptor=False,
+                    )
+                    self.save_har(clickstream_path + "baseline.json.gz")
+                    self.end_arm()
+
+                    self.results["clickstream"].append(clickstream)
+
+                    # Control group
+                    self.heartbeat("control")
+                    self.start_arm()
+                    control_clickstream = self.crawl_clickstream(
+                        clickstream=clickstream,
+                        clickstream_length=clickstream_length,
+                        crawl_name="control",
+                        set_request_interceptor=False,
+                    )
+                    self.current_actions += len(control_clickstream) + 1 # We add one since we count just getting the website as an action
+                    memory_exceeded = self.memory_exceeded
+                    self.save_har(clickstream_path + "control.json.gz")
+                    self.end_arm()
+
+                    # Experimental group
+                    self.heartbeat("experimental")
+                    self.start_arm()
+                    self.crawl_clickstream(
+                        clickstream=clickstream,
+                        # No need to traverse more than the control group. If the control group ended early
+                        # because of the memory budget, the experimental group ends at the same action.
+                        clickstream_length=len(control_clickstream) if memory_exceeded else clickstream_length,
+                        crawl_name="experimental",
+                        set_request_interceptor=True,
+                    )
+                    self.save_har(clickstream_path + "experimental.json.gz")
+                    self.end_arm()
+                except (InvalidSessionIdException, WebDriverException, JavascriptException, UnexpectedAlertPresentException) as e:
+                    Crawler.logger.error(f"Driver encountered {type(e).__name__}. Restarting...", exc_info=True)
+                    self.driver.quit()
+                    self.reusable_driver = False
+                finally:
+                    Crawler.logger.info(f"Data collected for {self.current_actions}/{total_actions} actions.")
+                    self.clickstream += 1
+
+                # Not reached if the worker is terminated mid-clickstream
+                self.save_checkpoint()
+
+            # Only a completed crawl covers its aliases
+            if self.alias_index is not None:
+                alias_of = self.alias_index.claim(self.url, self.domain)
+                if alias_of is not None:
+                    Crawler.logger.info(f"'{self.url}' was crawled concurrently for '{alias_of}', which claimed it first.")
+        except (CrawlInterrupted, SystemExit, KeyboardInterrupt):
+            # Terminated by the supervisor (SIGTERM raises SystemExit), so the site will be requeued and resume
+            interrupted = True
+            raise
+        finally:
+            # The site is done, whether it completed or failed
+            if not interrupted:
+                Path(self.checkpoint_path).unlink(missing_ok=True)
+            self.close_driver_pool()
 
     @log
     def crawl_inner_pages(
@@ -546,7 +1127,7 @@ class Crawler:
                     remove_cookie_class_interceptor(request)  # Intercept cookies
 
             # Set request interceptor
-            self.driver.request_interceptor = request_interceptor
+            self.install_request_interceptor(request_interceptor)
 
             # Remove previous HAR entries
             del self.driver.requests
@@ -556,6 +1137,7 @@ class Crawler:
             while attempt < self.total_get_attempts:
                 try:
                     # Attempt to get the website
+                    get_start = time.time()
                     self.driver.get(current_url.url)
 
                     break  # If successful, break out of the loop
@@ -583,7 +1165,7 @@ class Crawler:
                 continue
 
             # Wait for redirects and dynamic content
-            time.sleep(self.wait_time)
+            self.wait_until_ready(get_start)
 
             # Get domain and CMP name
             if current_depth == 0:
@@ -628,6 +1210,10 @@ class Crawler:
                 self.results["interaction_type"] = interaction_type
 
                 if type(interaction_type) is BannerClick:
+                    # Imported lazily since BannerClick pulls in pandas, bs4, and PIL,
+                    # which only compliance_algo needs
+                    import bannerclick.bannerdetection as bc
+
                     if interaction_type == BannerClick.ACCEPT:
                         magic_number = 1
                     elif interaction_type == BannerClick.REJECT:
@@ -667,7 +1253,7 @@ class Crawler:
 
             # Save HAR file
             if crawl_name:
-                self.save_har(uid_data_path + f"{crawl_name}.json")
+                self.save_har(uid_data_path + f"{crawl_name}.json.gz")
 
             # Don't need to visit neighbors if we're at the maximum depth
             if current_depth == depth:
@@ -721,21 +1307,34 @@ class Crawler:
 
         clickstream_path = self.data_path + f"{self.clickstream}/"
 
-        if set_request_interceptor:
-            # Define request interceptor
-            def request_interceptor(request: seleniumwire.request.Request):
+        # The resource policy and navigation guard apply to every arm, so that the arms remain comparable
+        if self.resource_policy:
+            resource_interceptor = functools.partial(
+                interceptors.block_resources_interceptor,
+                resource_types=self.resource_policy,
+                hits=self.results["resource_policy_hits"],
+            )
+
+        # Define request interceptor
+        def request_interceptor(request: seleniumwire.request.Request):
+            if self.navigation_guard is not None:
+                interceptors.block_navigation_interceptor(request, self.navigation_guard, self.blocked_navigations)
+            if self.resource_policy:
+                resource_interceptor(request)
+            if set_request_interceptor:
                 interceptors.remove_third_party_interceptor(request, self.url)
                 # interceptors.remove_all_interceptor(request)
-            self.driver.request_interceptor = request_interceptor
-        else:
-            del self.driver.request_interceptor
+        self.install_request_interceptor(request_interceptor)
 
+        # The landing page may redirect off-domain, so navigations are only guarded once it has loaded
+        self.navigation_guard = None
         try:
             self.get(self.url)
         except UrlDown:
             raise LandingPageDown()
 
         domain = utils.get_domain(self.url)
+        self.navigation_guard = domain
 
         self.driver.execute_script("window.scrollTo(0, 0);")
         if crawl_name:
@@ -768,6 +1367,8 @@ class Crawler:
                 element = self.driver.find_element(By.CSS_SELECTOR, action)
                 # Click
                 prev_url = self.driver.current_url
+                navigations = len(self.blocked_navigations)
+                click_time = time.time()
                 element.click()
             except (
                 NoSuchElementException,
@@ -790,9 +1391,19 @@ class Crawler:
                     return clickstream[:i]
 
             Crawler.logger.info(f"Completed action {i+1}/{clickstream_length}.")
+            self.heartbeat(action=i+1)
+            self.wait_until_ready(click_time)
 
             # Restrict within original domain
-            if utils.get_domain(self.driver.current_url) != domain:
+            if len(self.blocked_navigations) > navigations:
+                # Cancelled by the navigation guard, so the page has not changed
+                Crawler.logger.info(f"Cancelled off-domain navigation to {self.blocked_navigations[-1]}.")
+                self.results["offdomain_clicks"] += 1
+                if generate_clickstream:
+                    continue
+            elif utils.get_domain(self.driver.current_url) != domain:
+                # Navigations the guard cannot recognize (see interceptors.block_navigation_interceptor)
+                self.results["offdomain_clicks"] += 1
                 try:
                     self.get(self.url)
                 except UrlDown:
@@ -800,7 +1411,6 @@ class Crawler:
 
             # Extract data
             self.driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(self.wait_time)
             if crawl_name:
                 self.extract_features(clickstream_path, crawl_name)
                 self.save_screenshot(clickstream_path + f"{crawl_name}-{i+1}")
@@ -812,21 +1422,83 @@ class Crawler:
             
             i += 1
 
+            # End the clickstream at this action if the browser has grown too large.
+            # The next clickstream starts in a new browser (see end_arm).
+            if i < clickstream_length and self.over_memory_budget():
+                Crawler.logger.warning(f"Ending clickstream {self.clickstream} ({crawl_name}) after action {i}/{clickstream_length} to recycle the browser.")
+                self.memory_exceeded = True
+                self.results["memory_recycles"] += 1
+                return clickstream if generate_clickstream else clickstream[:i]
+
         Crawler.logger.info(f"Completed clickstream {self.clickstream} ({crawl_name}).")
 
         return clickstream
 
-    def inject_script(self, path: str) -> Any:
+    def in_flight_requests(self, since: float) -> int:
+        """
+        Return the number of requests made since `since` (seconds since epoch) that have not received a response.
+        Only available with a settle time (see interceptors.RequestTracker).
+        """
+        return self.driver.request_tracker.in_flight(since)
+
+    def wait_until_ready(self, since: float) -> float:
+        """
+        Wait until the current page has finished loading and rendering, for at most `self.wait_time`.
+
+        The page is ready once none of the requests made since `since` are in flight (as seen by seleniumwire)
+        and the DOM has not changed for `self.settle_time` (see injections/dom-quiescence.js).
+        Without a settle time, always waits `self.wait_time`.
+
+        Args:
+            since: Time (seconds since epoch) of the navigation or action that is being waited on.
+
+        Returns:
+            Time waited (seconds).
+        """
+        start = time.time()
+        deadline = start + self.wait_time
+
+        if self.settle_time is None:
+            time.sleep(self.wait_time)
+        else:
+            with open("injections/dom-quiescence.js", "r") as file:
+                js = file.read()
+
+            while time.time() < deadline:
+                time.sleep(min(self.settle_time / 2, max(deadline - time.time(), 0)))
+                try:
+                    ready_state, quiet_time = self.driver.execute_script(js)
+                    if ready_state == "complete" and quiet_time >= self.settle_time * 1000 and self.in_flight_requests(since) == 0:
+                        break
+                except WebDriverException:  # E.g., the page is navigating
+                    continue
+
+        waited = time.time() - start
+        Crawler.logger.info(f"Waited {waited:.2f}/{self.wait_time} seconds for '{self.driver.current_url}'.")
+
+        self.results["ready_waits"]["count"] += 1
+        self.results["ready_waits"]["time"] += waited
+        self.results["ready_waits"]["cap_time"] += self.wait_time
+
+        return waited
+
+    def inject_script(self, path: str, asynchronous: bool = False) -> Any:
         """
         Inject a JavaScript file into the current page.
+
+        Args:
+            path: Path of the JavaScript file.
+            asynchronous: Whether to run the script with execute_async_script. Defaults to False.
         """
         with open(path, "r") as file:
             js = file.read()
 
+        execute = self.driver.execute_async_script if asynchronous else self.driver.execute_script
+
         ATTEMPTS = 3
         for i in range(ATTEMPTS):
             try:
-                return self.driver.execute_script(js)
+                return execute(js)
             except JavascriptException:
                 Crawler.logger.warning(f"Failed to inject '{path}'. Attempt {i+1}/{ATTEMPTS}.")
             
@@ -940,21 +1612,16 @@ class Crawler:
 
     def save_har(self, file_path: str) -> None:
         """
-        Save current HAR file to file_path.
+        Save current HAR file to file_path, compressed and one entry at a time (see utils/har.py).
 
         NOTE: Requests continually get logged to the same HAR file.
         To start logging a new HAR file, use: 'del self.driver.requests'.
 
         Args:
-            file_path: Path to save the HAR file. The file extension should be '.json'.
+            file_path: Path to save the HAR file. The file extension should be '.json.gz'.
         """
-        if not file_path.lower().endswith(".json"):
-            raise ValueError("File extension must be `.json`.")
-
-        data = json.loads(self.driver.har)
-
-        with open(file_path, 'w') as file:
-            json.dump(data, file, indent=4)
+        creator = {"name": "Selenium Wire HAR dump", "version": seleniumwire.__version__}
+        write_har(file_path, stored_har_entries(self.driver.backend.storage), creator)
 
     def back(self) -> None:
         """
@@ -7,8 +7,9 @@ from pathlib import Path
 import yaml
 import matplotlib.pyplot as plt
 import matplotlib as mpl
-from filelock import FileLock
 from crawler import CrawlResults
+from utils.results_log import read_results
+from utils.work_queue import read_domains
 from utils.utils import get_directories, get_domain, split
 from utils.image_shingle import ImageShingle
 import time
@@ -31,16 +32,10 @@ with open(config["SITE_LIST_PATH"]) as file:
         site_list.append(line.strip())
 
 # Site queue
-queue_lock = FileLock(config["QUEUE_PATH"] + '.lock', timeout=60)
-with queue_lock:
-    with open(config["QUEUE_PATH"], 'r') as file:
-        site_queue = json.load(file)
+site_queue = read_domains(config["QUEUE_PATH"])
 
 # Site results
-results_lock = FileLock(config["RESULTS_PATH"] + '.lock', timeout=60)
-with results_lock:
-    with open(config["RESULTS_PATH"]) as file:
-        site_results: dict[str, CrawlResults] = json.load(file)
+site_results: dict[str, CrawlResults] = read_results(config["RESULTS_PATH"])
 
 """
 Check crawl completion.
@@ -53,13 +48,14 @@ A successful site must have:
 1. a successful domain -> url resolution
 3. was not terminated via SIGKILL
 2. no unexpected crawl exceptions
+4. was crawled itself rather than recorded as an alias of another site
 """
 successful_sites = []
 unsuccessful_sites = []
 keys: Set[str] = set()
 for domain, result in site_results.items():
     keys.update(result.keys())
-    if result.get("url") and not result.get("SIGKILL") and not result.get("unexpected_exception"):
+    if result.get("url") and not result.get("SIGKILL") and not result.get("unexpected_exception") and not result.get("alias_of"):
         successful_sites.append(domain)
     else:
         unsuccessful_sites.append(domain)
@@ -0,0 +1,152 @@
+import argparse
+import functools
+import http.server
+import shutil
+import threading
+from typing import Any
+
+from crawler import Crawler, CrawlResults
+
+"""
+Equivalence test for fast reset mode (see Crawler.reset_driver).
+
+Serves the fixture pages in testcases/fast-reset/ locally. The fixture page
+records any site data left from earlier visits, then stores cookies,
+localStorage, sessionStorage, IndexedDB, Cache API data, a service worker,
+and HTTP-cached resources.
+
+Each mode visits the fixture twice, once per arm, and checks what the second
+visit observed: in the page, and in the requests received by the server.
+A reset browser must observe exactly the same as a freshly launched one.
+
+Requires Firefox and geckodriver. Run with `python3 fast_reset_test.py [--headed]` or pytest.
+"""
+
+FIXTURE_PATH = "testcases/fast-reset/"
+HEADLESS = True
+
+# What the fixture page observes in a browser without site data
+CLEAN = {
+    "cookie": "",
+    "localStorage": [],
+    "sessionStorage": [],
+    "indexedDB": [],
+    "cacheStorage": [],
+    "serviceWorkers": 0,
+    "controlled": False,
+}
+
+
+class FixtureHandler(http.server.SimpleHTTPRequestHandler):
+    """
+    Serve the fixture pages, set a cookie, make resources cacheable, and log each request.
+    """
+
+    requests: list[tuple[str, bool]] = []  # (path, whether a Cookie header was sent)
+
+    def end_headers(self) -> None:
+        if self.path.split("?")[0] in ("/", "/index.html"):
+            self.send_header("Set-Cookie", "fixture-header=1; Max-Age=3600; HttpOnly")
+            self.send_header("Cache-Control", "no-store")
+        else:
+            self.send_header("Cache-Control", "max-age=3600")
+        super().end_headers()
+
+    def do_GET(self) -> None:
+        FixtureHandler.requests.append((self.path, "Cookie" in self.headers))
+        super().do_GET()
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+@functools.lru_cache(maxsize=None)
+def fixture_url() -> str:
+    """
+    Start serving the fixture in the background and return the URL of its page.
+    """
+    handler = functools.partial(FixtureHandler, directory=FIXTURE_PATH)
+    server = http.server.ThreadingHTTPServer(("localhost", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://localhost:{server.server_address[1]}/index.html"
+
+
+def visit(crawler: Crawler, url: str) -> tuple[dict[str, Any], list[tuple[str, bool]]]:
+    """
+    Visit the fixture page in a new arm and return what the page and the server observed.
+    """
+    crawler.start_arm()
+    FixtureHandler.requests = []
+
+    crawler.driver.get(url)
+    observed = crawler.driver.execute_async_script("window.fixture.then(arguments[arguments.length - 1]);")
+    requests = sorted(set(FixtureHandler.requests))
+
+    crawler.end_arm()
+    return observed, requests
+
+
+@functools.lru_cache(maxsize=None)
+def run(fast_reset: bool) -> tuple[dict[str, Any], list[tuple[str, bool]], CrawlResults]:
+    """
+    Visit the fixture in two arms and return what the second arm observed, and the crawl results.
+    """
+    crawler = Crawler(f"fast-reset-test-{fast_reset}", headless=HEADLESS, fast_reset=fast_reset)
+    try:
+        visit(crawler, fixture_url())
+        observed, requests = visit(crawler, fixture_url())
+    finally:
+        crawler.driver.quit()
+        shutil.rmtree(crawler.data_path, ignore_errors=True)
+
+    return observed, requests, crawler.results
+
+
+def assert_clean(observed: dict[str, Any], requests: list[tuple[str, bool]]) -> None:
+    """
+    Assert that the second arm started without site data from the first arm.
+    """
+    assert observed == CLEAN, observed
+
+    # The page is the first request of the arm, so no cookie may be sent with it
+    assert ("/index.html", False) in requests, requests
+    assert ("/index.html", True) not in requests, requests
+
+    # Cacheable resources are requested again rather than served from the HTTP cache
+    paths = {path for path, _ in requests}
+    assert {"/cached.png", "/cached.txt"} <= paths, requests
+
+
+def test_fresh_launch_clean() -> None:
+    observed, requests, _ = run(fast_reset=False)
+
+    assert_clean(observed, requests)
+
+
+def test_fast_reset_clean() -> None:
+    observed, requests, results = run(fast_reset=True)
+
+    # The second arm reused the reset browser instead of falling back to a new launch
+    assert results["fast_resets"] == 1, results["fast_resets"]
+    assert results["fast_reset_failures"] == 0, results["fast_reset_failures"]
+    assert_clean(observed, requests)
+
+
+def test_fast_reset_equivalent() -> None:
+    fresh_observed, fresh_requests, _ = run(fast_reset=False)
+    reset_observed, reset_requests, _ = run(fast_reset=True)
+
+    assert reset_observed == fresh_observed, (reset_observed, fresh_observed)
+    assert reset_requests == fresh_requests, (reset_requests, fresh_requests)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that fast reset leaves the browser as clean as a fresh launch.")
+    parser.add_argument("--headed", action="store_true", help="Show the browser.")
+    args = parser.parse_args()
+    HEADLESS = not args.headed
+
+    test_fresh_launch_clean()
+    test_fast_reset_clean()
+    test_fast_reset_equivalent()
+    print("All tests passed.")
@@ -1,6 +1,5 @@
 import config
-import json
-from filelock import FileLock
+from utils.work_queue import WorkQueue
 
 SITES_TO_INJECT = [
     "arstechnica.com",
@@ -14,7 +13,7 @@ print(len(set(SITES_TO_INJECT)))
 
 if (
     input(
-        "This is a destructive action if you are injecting duplicates. Are you sure you want to continue? (y/n) "
+        "Injected sites are recrawled even if they were already crawled. Are you sure you want to continue? (y/n) "
     )
     != "y"
 ):
@@ -22,16 +21,7 @@ if (
     exit(0)
 
 
-queue_lock = FileLock(config.QUEUE_PATH + ".lock", timeout=10)
-
-with queue_lock:
-    with open(config.QUEUE_PATH, "r") as file:
-        sites = json.load(file)
-
-    sites.extend(SITES_TO_INJECT)
-    # sites[:0] = SITES_TO_INJECT
-
-    with open(config.QUEUE_PATH, "w") as file:
-        json.dump(sites, file)
+queue = WorkQueue(config.QUEUE_PATH, config.QUEUE_VISIBILITY_TIMEOUT, config.QUEUE_MAX_ATTEMPTS)
+queue.requeue(SITES_TO_INJECT)
 
 print("Injection complete.")
@@ -0,0 +1,57 @@
+/**
+ * Summarize the site data stored by the browser.
+ *
+ * Must be run in the chrome context with driver.execute_async_script().
+ * @returns {Object} Number of cookies, service worker registrations, and HTTP cache entries,
+ *     and web origins with data in the quota manager (localStorage, IndexedDB, Cache API)
+ */
+
+const callback = arguments[arguments.length - 1];
+
+function cacheEntries(storage) {
+    return new Promise(resolve => {
+        let entries = 0;
+        storage.asyncVisitStorage({
+            onCacheStorageInfo(entryCount) {
+                entries = entryCount;
+            },
+            onCacheEntryInfo() {},
+            onCacheEntryVisitCompleted() {
+                resolve(entries);
+            },
+            QueryInterface: ChromeUtils.generateQI(["nsICacheStorageVisitor"]),
+        }, false);
+    });
+}
+
+function storageOrigins() {
+    return new Promise(resolve => {
+        Services.qms.getUsage(request => {
+            if (request.resultCode !== Cr.NS_OK) {
+                resolve([]);
+                return;
+            }
+            resolve(
+                request.result
+                    .filter(origin => origin.origin.startsWith("http") && origin.usage > 0)
+                    .map(origin => origin.origin)
+            );
+        });
+    });
+}
+
+const serviceWorkers = Cc["@mozilla.org/serviceworkers/manager;1"].getService(Ci.nsIServiceWorkerManager);
+const context = Services.loadContextInfo.default;
+
+Promise.all([
+    cacheEntries(Services.cache2.diskCacheStorage(context)),
+    cacheEntries(Services.cache2.memoryCacheStorage(context)),
+    storageOrigins(),
+]).then(([diskEntries, memoryEntries, origins]) => {
+    callback({
+        cookies: Services.cookies.cookies.length,
+        serviceWorkers: serviceWorkers.getAllRegistrations().length,
+        cacheEntries: diskEntries + memoryEntries,
+        storageOrigins: origins,
+    });
+}).catch(error => callback({error: String(error)}));
@@ -0,0 +1,19 @@
+/**
+ * Clear all site data: cookies, DOM storage (localStorage, IndexedDB, Cache API),
+ * service workers, the HTTP and image caches, and site permissions.
+ *
+ * Must be run in the chrome context with driver.execute_async_script().
+ * See: https://searchfox.org/mozilla-central/source/toolkit/components/cleardata/nsIClearDataService.idl
+ * @returns {number} Flags of the data types that could not be cleared (0 on success)
+ */
+
+const callback = arguments[arguments.length - 1];
+
+// Close idle connections so no TLS sessions or keep-alive connections carry over
+Services.obs.notifyObservers(null, "net:prune-all-connections");
+
+Services.clearData.deleteData(Ci.nsIClearDataService.CLEAR_ALL, {
+    onDataDeleted(failedFlags) {
+        callback(failedFlags);
+    },
+});
@@ -0,0 +1,21 @@
+/**
+ * Report how long the DOM has been unchanged.
+ * A MutationObserver is installed on the first injection into each document.
+ * See: https://developer.mozilla.org/en-US/docs/Web/API/MutationObserver
+ * @returns {[string, number]} document.readyState and milliseconds since the last DOM mutation
+ */
+
+if (window.domQuiescenceLastMutation === undefined) {
+    window.domQuiescenceLastMutation = performance.now();
+
+    new MutationObserver(() => {
+        window.domQuiescenceLastMutation = performance.now();
+    }).observe(document, {
+        childList: true,
+        subtree: true,
+        attributes: true,
+        characterData: true,
+    });
+}
+
+return [document.readyState, performance.now() - window.domQuiescenceLastMutation];
@@ -0,0 +1,107 @@
+/**
+ * Cheaply check whether the current page is up, without computing styles or selectors
+ * (see clickable-elements.js for the full extraction).
+ *
+ * Signals are based on well-known markers in the page title, text, and resource URLs:
+ * - parked: Domain parking and for-sale pages. Requires both a parking phrase and a resource from a parking service
+ * - errorPage: Server error pages, whose title or heading is a status line (e.g., "404 Not Found", "502 Bad Gateway")
+ * - challenge: Bot challenges (e.g., Cloudflare, DataDome, PerimeterX)
+ *
+ * The signals are heuristics, so they are recorded rather than treated as the page being down.
+ *
+ * clickableCount only includes rendered links, buttons, and elements with an onclick handler, so a page
+ * whose only clickable elements are hidden is checked with the full extraction.
+ *
+ * @returns {Object} readyState, elementCount, clickableCount, textLength, parked, errorPage, challenge
+ */
+
+var title = document.title || "";
+var text = document.body ? document.body.innerText || "" : "";
+var head = (title + "\n" + text.slice(0, 2000)).toLowerCase();
+
+var resources = Array.prototype.map.call(
+    document.querySelectorAll("script[src], iframe[src], link[href]"),
+    element => (element.src || element.href || "").toLowerCase()
+);
+var sources = resources.join("\n");
+
+// Hostnames of the resources, e.g., "www.sedoparking.com"
+var hosts = resources.map(resource => {
+    try {
+        return new URL(resource, document.baseURI).hostname;
+    } catch (e) {
+        return "";
+    }
+});
+
+// The elements of clickable-elements.js, except those only clickable by their pointer cursor, which needs computed styles.
+// Elements that are not rendered (e.g., display: none, or inside a hidden element) have no client rects.
+var clickableCount = Array.prototype.filter.call(
+    document.querySelectorAll("a, button, [onclick]"),
+    element => (element.tagName === "BUTTON" || element.tagName === "A" || element.onclick != null) && element.getClientRects().length > 0
+).length;
+
+function matches(haystack, needles) {
+    return needles.some(needle => haystack.includes(needle));
+}
+
+// True iff a hostname is one of the given domains or a subdomain of one (e.g., "img.dan.com" but not "jordan.com")
+function fromDomains(hostnames, domains) {
+    return hostnames.some(hostname => domains.some(domain => hostname === domain || hostname.endsWith("." + domain)));
+}
+
+var parked = matches(head, [
+    "domain is for sale",
+    "domain may be for sale",
+    "buy this domain",
+    "this domain is parked",
+    "parked free",
+    "domain parking",
+]) && fromDomains(hosts, [
+    "sedoparking.com",
+    "parkingcrew.net",
+    "bodis.com",
+    "above.com",
+    "dan.com",
+    "afternic.com",
+    "hugedomains.com",
+]);
+
+// Status lines of server error pages. The title or first heading must be exactly one of them (e.g., not "404 Media")
+var statusLines = [
+    "400 bad request",
+    "403 forbidden",
+    "404 not found",
+    "500 internal server error",
+    "502 bad gateway",
+    "503 service unavailable",
+    "503 service temporarily unavailable",
+    "504 gateway time-out",
+    "504 gateway timeout",
+];
+var heading = document.querySelector("h1");
+var errorPage = [title, heading ? heading.innerText || "" : ""].some(
+    line => statusLines.includes(line.trim().toLowerCase().replace(/\s+/g, " "))
+);
+
+var challenge = matches(head, [
+    "just a moment...",
+    "checking your browser",
+    "verify you are human",
+    "attention required! | cloudflare",
+    "access denied",
+]) || matches(sources, [
+    "challenge-platform",
+    "captcha-delivery.com",
+    "px-captcha",
+]);
+
+return {
+    readyState: document.readyState,
+    elementCount: document.getElementsByTagName("*").length,
+    clickableCount: clickableCount,
+    textLength: text.length,
+    parked: parked,
+    errorPage: errorPage,
+    challenge: challenge,
+};
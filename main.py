@@ -1,30 +1,91 @@
-import json
 import logging
+import logging.handlers
 import multiprocessing as mp
 import os
-from filelock import FileLock
+import resource
+import shutil
+from queue import Empty
 from signal import signal, SIGTERM
 import sys
 import time
+from typing import Callable, Optional
 
-from crawler import Crawler, CrawlDataEncoder, CrawlResults
+from crawler import Crawler, CrawlDataEncoder, CrawlResults, Heartbeat, CHECKPOINT_FILE
+from utils.alias_index import AliasIndex
+from utils.capture import CapturePolicy
+from utils.firefox_profile import build_template
+from utils.prefilter import read_prefilter
+from utils.process_group import SiteProcessGroup, isolate, remove_stale_temp_dirs
+from utils.results_log import ResultsLog
+from utils.work_queue import WorkQueue
 import config
 
 logger = logging.getLogger(config.LOGGER_NAME)
 SLURM_ARRAY_TASK_ID = int(os.getenv('SLURM_ARRAY_TASK_ID', '0')) # type: ignore
 
-def worker(domain: str, queue: mp.Queue) -> None:
+def get_context() -> mp.context.BaseContext:
+    """
+    Return the multiprocessing context used to launch crawl processes.
+
+    With forkserver, each crawl process is forked from a server that has already imported
+    crawler.py (including seleniumwire and selenium), so imports are only paid once per worker.
+    """
+    ctx = mp.get_context(config.WORKER_START_METHOD)
+    if config.WORKER_START_METHOD == "forkserver":
+        ctx.set_forkserver_preload(["crawler"])  # type: ignore[attr-defined]
+    return ctx
+
+def worker(
+        domain: str,
+        queue: mp.Queue,
+        heartbeats: mp.Queue,
+        log_queue: mp.Queue,
+        temp_dir: str,
+        template_profile: Optional[str],
+        url_hint: Optional[str],
+        alias_index: Optional[AliasIndex],
+) -> None:
     """
     We need to use multiprocessing to explicitly free up memory after each crawl.
     See https://stackoverflow.com/questions/38164635/selenium-not-freeing-up-memory-even-after-calling-close-quit
     for more details.
+
+    Progress is reported to the supervisor through `heartbeats`.
+    Logs are sent to the supervisor through `log_queue`, since crawl processes
+    do not inherit the supervisor's log handlers unless they are forked from it.
+
+    The crawl process runs in its own process group with its own temp directory
+    (see utils/process_group.py), so the supervisor can clean up after it.
     """
+    isolate(temp_dir)
+
+    logger.setLevel(logging.INFO)
+    logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+
     logger.info(f"Starting crawl for '{domain}'.")
-    crawler = Crawler(domain, headless=True, wait_time=config.WAIT_TIME)
+    crawler = Crawler(
+        domain,
+        headless=True,
+        wait_time=config.WAIT_TIME,
+        heartbeat=heartbeats.put,
+        resume=True,
+        driver_pool_size=config.DRIVER_POOL_SIZE,
+        template_profile=template_profile,
+        url_hint=url_hint,
+        alias_index=alias_index,
+        resource_policy=config.RESOURCE_POLICY,
+        capture_policy=CapturePolicy.from_config(),
+        fast_reset=config.FAST_RESET,
+        memory_budget=config.BROWSER_MEMORY_BUDGET,
+        settle_time=config.WAIT_SETTLE_TIME,
+    )
     def before_exit(*args):
-        crawler.driver.quit()
+        if hasattr(crawler, "driver"):  # Not set if no browser was launched yet
+            crawler.driver.quit()
+        crawler.close_driver_pool()
 
         crawler.results["SIGTERM"] = True
+        crawler.results["cpu_time"] = cpu_time()
         queue.put(crawler.results)
 
         sys.exit(0)
@@ -33,55 +94,145 @@ def worker(domain: str, queue: mp.Queue) -> None:
 
     # result = crawler.compliance_algo(config.DEPTH)
     result = crawler.classification_algo(total_actions=config.TOTAL_ACTIONS, clickstream_length=config.CLICKSTREAM_LENGTH)
+    result["cpu_time"] = cpu_time()
 
     queue.put(result)
 
-def main():
-    logger.setLevel(logging.INFO)
+def progress(heartbeat: Heartbeat) -> tuple:
+    """
+    Return the position of a crawl in a heartbeat, which changes whenever the crawl makes progress.
+    """
+    return heartbeat["phase"], heartbeat["clickstream"], heartbeat["action"], heartbeat["actions"]
 
-    formatter = logging.Formatter("%(asctime)s %(levelname)s: %(message)s", "%Y-%m-%d %H:%M:%S")
+def cpu_time() -> float:
+    """
+    Return the CPU time (seconds) used by this process and its exited descendants (e.g., geckodriver and firefox after quitting).
+    """
+    return sum(
+        usage.ru_utime + usage.ru_stime
+        for usage in (resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN))
+    )
 
-    log_file = logging.FileHandler(f'{config.DATA_PATH}/{SLURM_ARRAY_TASK_ID}.log', 'a')
-    log_file.setLevel(logging.DEBUG)
-    log_file.setFormatter(formatter)
-    logger.addHandler(log_file)
+def crawl(worker_id: str, admit: Optional[Callable[[], None]] = None) -> None:
+    """
+    Crawl sites from the queue one at a time until the queue is empty.
+
+    Args:
+        worker_id: Unique name of this worker. Used for the results shard and queue bookkeeping.
+        admit: Called before leasing each site and blocks until the site may start. Defaults to None, where sites start immediately.
+    """
+    ctx = get_context()
 
     # Create input for pool
-    output = mp.Queue()
-    data = {}
+    output = ctx.Queue()
+    heartbeats = ctx.Queue()
+
+    # Forward logs from crawl processes to this process's handlers
+    log_queue = ctx.Queue()
+    log_listener = logging.handlers.QueueListener(log_queue, *logger.handlers, respect_handler_level=True)
+    log_listener.start()
 
-    results_lock = FileLock(config.RESULTS_PATH + '.lock', timeout=10)
-    queue_lock = FileLock(config.QUEUE_PATH + '.lock', timeout=10)
+    results = ResultsLog(config.RESULTS_PATH, shard=worker_id, cls=CrawlDataEncoder)
+    queue = WorkQueue(config.QUEUE_PATH, config.QUEUE_VISIBILITY_TIMEOUT, config.QUEUE_MAX_ATTEMPTS)
+
+    removed = remove_stale_temp_dirs()
+    if removed:
+        logger.warning(f"Removed {removed} temp directories left by killed workers.")
+
+    template_profile = build_template(config.FIREFOX_PROCESS_COUNT) if config.FIREFOX_TEMPLATE_PROFILE else None
+    reachability = read_prefilter(config.PREFILTER_PATH)
+    alias_index = AliasIndex(config.ALIAS_INDEX_PATH) if config.COLLAPSE_ALIASES else None
 
     while True:
+        # The autoscaler asks workers to exit between sites, since cancelling a worker could interrupt a lease
+        stop_request = f"{config.STOP_PATH}{worker_id}"
+        if os.path.exists(stop_request):
+            logger.info("Stop requested, exiting.")
+            os.remove(stop_request)
+            break
+
+        if admit is not None:
+            admit()
+
         start_time = time.time()
         
         # Get next site to crawl
-        with queue_lock:
-            with open(config.QUEUE_PATH, 'r') as file:
-                sites = json.load(file)
-                if len(sites) == 0:
-                    logger.info("Queue is empty, exiting.")
-                    break
-                domain = sites.pop(0)
-            with open(config.QUEUE_PATH, 'w') as file:
-                json.dump(sites, file)
-                
-        process = mp.Process(target=worker, args=(domain, output))
+        domain = queue.lease(worker=worker_id)
+        if domain is None:
+            logger.info("Queue is empty, exiting.")
+            break
+
+        # Sites whose prefiltered landing page was already claimed by another site are aliases and need no browser.
+        # The crawler claims its landing page once its crawl completes.
+        final_url = reachability.get(domain, {}).get("final_url")
+        if alias_index is not None and final_url:
+            alias_of = alias_index.owner(final_url)
+            if alias_of is not None:
+                logger.info(f"'{final_url}' was already crawled for '{alias_of}'. Recording '{domain}' as an alias.")
+                results.append(domain, {
+                    "url": final_url,
+                    "data_path": f"{config.DATA_PATH}{domain}/",
+                    "landing_page_down": False,
+                    "unexpected_exception": False,
+                    "alias_of": alias_of,
+                    "total_time": time.time() - start_time,
+                })
+                queue.ack(domain, worker_id)
+                continue
+
+        # A previous lease on this site expired before it was acknowledged.
+        # The crawl resumes from its checkpoint if it has one, otherwise it starts over.
+        data_path = f"{config.DATA_PATH}{domain}/"
+        if os.path.exists(data_path) and not os.path.exists(data_path + CHECKPOINT_FILE):
+            logger.warning(f"Removing incomplete crawl data for '{domain}'.")
+            shutil.rmtree(data_path)
+
+        group = SiteProcessGroup(domain)
+        process = ctx.Process(  # type: ignore[attr-defined]
+            target=worker,
+            args=(domain, output, heartbeats, log_queue, group.temp_dir, template_profile, reachability.get(domain, {}).get("url"), alias_index),
+        )
         process.start()
+        group.start(process.pid)
         print(domain)
-        # TIMEOUT = 60 * 60  # 1 hour
-        TIMEOUT = 60*40
-        process.join(TIMEOUT)
+
+        # Wait for the crawl to finish as long as it keeps making progress, up to the time limit per site.
+        # Heartbeats that repeat the last phase and action (e.g., from retries of the same page) are not progress.
+        last_heartbeat: Optional[Heartbeat] = None
+        last_progress_time = last_extend_time = time.time()
+        deadline = start_time + config.SITE_TIMEOUT if config.SITE_TIMEOUT is not None else float("inf")
+        while process.exitcode is None and time.time() - last_progress_time < config.STALL_TIMEOUT and time.time() < deadline:
+            process.join(config.HEARTBEAT_POLL_INTERVAL)
+            group.sample()
+
+            while True:
+                try:
+                    heartbeat = heartbeats.get_nowait()
+                except Empty:
+                    break
+
+                if last_heartbeat is None or progress(heartbeat) != progress(last_heartbeat):
+                    last_progress_time = time.time()
+                last_heartbeat = heartbeat
+
+            # Keep the lease while the crawl is making progress
+            if last_progress_time - last_extend_time > config.STALL_TIMEOUT:
+                if not queue.extend(domain, worker_id):
+                    logger.warning(f"Lost the lease on '{domain}'. Its result will not complete it in the queue.")
+                last_extend_time = last_progress_time
         logger.info(f"Joining process for '{domain}'.")
         
         sigkill = False
-        if process.exitcode is None:
-            logger.warning(f"Terminating process for '{domain}' due to timeout.")
+        timed_out = process.exitcode is None and time.time() >= deadline
+        stalled = process.exitcode is None and not timed_out
+        if timed_out:
+            logger.warning(f"Terminating process for '{domain}' after the time limit of {config.SITE_TIMEOUT} seconds. Last heartbeat: {last_heartbeat}.")
+        elif stalled:
+            logger.warning(f"Terminating process for '{domain}' after {config.STALL_TIMEOUT} seconds without progress. Last heartbeat: {last_heartbeat}.")
+        if timed_out or stalled:
             process.terminate()
-            process.join()
-            
-            time.sleep(60)
+            process.join(config.TERMINATE_TIMEOUT)
+
             if process.exitcode is None:
                 logger.critical(f"SIGTERM failed, escalating to SIGKILL.")
                 process.kill()
@@ -89,12 +240,15 @@ def main():
                 
                 sigkill = True
 
+        # Kill any browser processes that outlived the crawl process
+        orphans = group.reap()
+
 
         result = CrawlResults()
         if not sigkill:
             try:
                 result = output.get(timeout=60)
-            except mp.queues.Empty:
+            except Empty:
                 logger.critical(f"Queue for '{domain}' is empty.")
                 result = {
                     "data_path": f"{config.DATA_PATH}{domain}/",
@@ -108,21 +262,50 @@ def main():
                 "total_time": time.time() - start_time,
             }
             
-        # if result is not None:    
-        #     result['SLURM_ARRAY_TASK_ID'] = SLURM_ARRAY_TASK_ID
-        #     result['total_time'] = 
+        if not isinstance(result, dict):
+            logger.critical(f"Crawl process for '{domain}' sent {result!r} instead of a result.")
+            result = {
+                "data_path": f"{config.DATA_PATH}{domain}/",
+                "unexpected_exception": True,
+            }
 
-        # Read existing data, update it, and write back
-        
-        with results_lock:
-            with open(config.RESULTS_PATH, 'r') as f:
-                data = json.load(f)
+        # Recorded for every site so future crawls can be ordered by cost (see utils/site_cost.py)
+        result.setdefault("total_time", time.time() - start_time)
+
+        # CPU time reported by the crawl process is exact, but missing if it was killed
+        stats = group.stats()
+        stats["cpu_time"] = max(stats["cpu_time"], result.get("cpu_time", 0))
+        result.update(stats)
+        result["orphans_killed"] = orphans
 
-        data[domain] = result
+        if stalled:
+            if queue.nack(domain, worker_id):
+                logger.warning(f"Requeued '{domain}'.")
+                continue
+
+            result["stalled"] = True
+
+        # A site that used up its time limit would use it up again, so it is not requeued
+        if timed_out:
+            result["timed_out"] = True
+
+        results.append(domain, result)
+
+        queue.ack(domain, worker_id)
+
+    log_listener.stop()
+
+def main():
+    logger.setLevel(logging.INFO)
+
+    formatter = logging.Formatter("%(asctime)s %(levelname)s: %(message)s", "%Y-%m-%d %H:%M:%S")
+
+    log_file = logging.FileHandler(f'{config.DATA_PATH}/{SLURM_ARRAY_TASK_ID}.log', 'a')
+    log_file.setLevel(logging.DEBUG)
+    log_file.setFormatter(formatter)
+    logger.addHandler(log_file)
 
-        with results_lock:
-            with open(config.RESULTS_PATH, 'w') as f:
-                json.dump(data, f, cls=CrawlDataEncoder)
+    crawl(str(SLURM_ARRAY_TASK_ID))
 
 if __name__ == "__main__":    
     main()
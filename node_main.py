@@ -0,0 +1,149 @@
+import argparse
+import logging
+import logging.handlers
+import multiprocessing as mp
+import os
+import socket
+import time
+
+from main import crawl
+from utils.resources import available_memory, load_per_cpu
+import config
+
+logger = logging.getLogger(config.LOGGER_NAME)
+
+
+class Admission:
+    """
+    Decide when a worker on this node may start crawling a new site.
+
+    Shared by all workers on the node. Only one worker is admitted at a time,
+    and each admission is followed by a settle time so that the new browser
+    has allocated its memory before the next measurement.
+    """
+
+    def __init__(self, min_available_memory: float, max_load: float, settle_time: float) -> None:
+        """
+        Args:
+            min_available_memory: Available memory (GB) required to start a site.
+            max_load: Maximum 1-minute load average per CPU to start a site.
+            settle_time: Minimum time (seconds) between two admissions.
+        """
+        self.min_available_memory = min_available_memory * 1024**3
+        self.max_load = max_load
+        self.settle_time = settle_time
+
+        self.lock = mp.Lock()
+        self.last_admission = mp.Value("d", 0.0)
+
+    def __call__(self) -> None:
+        """
+        Block until a new site may start.
+        """
+        with self.lock:
+            logged = False
+            while True:
+                wait = self.last_admission.value + self.settle_time - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+                    continue
+
+                memory, load = available_memory(), load_per_cpu()
+                if memory >= self.min_available_memory and load <= self.max_load:
+                    break
+
+                if not logged:
+                    logger.info(f"Waiting for resources ({memory / 1024**3:.1f} GB available, load {load:.2f} per CPU).")
+                    logged = True
+                time.sleep(config.NODE_POLL_INTERVAL)
+
+            self.last_admission.value = time.time()
+
+
+def node_worker(worker_id: str, log_queue: mp.Queue, admit: Admission) -> None:
+    """
+    Run a crawl worker that sends its logs to the supervisor.
+    """
+    logger.setLevel(logging.INFO)
+
+    # A forked worker inherits the supervisor's handler, which would log every record twice
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    # Records are formatted here so that the worker ID is included in the merged log
+    formatter = logging.Formatter(f"%(asctime)s %(levelname)s [{worker_id}]: %(message)s", "%Y-%m-%d %H:%M:%S")
+
+    log_handler = logging.handlers.QueueHandler(log_queue)
+    log_handler.setLevel(logging.DEBUG)
+    log_handler.setFormatter(formatter)
+    logger.addHandler(log_handler)
+
+    crawl(worker_id, admit=admit)
+
+
+def main(workers: int) -> None:
+    """
+    Run `workers` concurrent crawl workers on this node until the queue is empty.
+
+    Crashed workers are restarted. All worker logs are merged into a single log file.
+    """
+    node_name = socket.gethostname()
+
+    # Merge worker logs
+    log_queue: mp.Queue = mp.Queue()
+    log_file = logging.FileHandler(f"{config.DATA_PATH}/{node_name}.log", "a")
+    log_file.setFormatter(logging.Formatter("%(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, log_file)
+    listener.start()
+
+    # The supervisor logs through the same queue
+    supervisor_formatter = logging.Formatter("%(asctime)s %(levelname)s [supervisor]: %(message)s", "%Y-%m-%d %H:%M:%S")
+    supervisor_handler = logging.handlers.QueueHandler(log_queue)
+    supervisor_handler.setFormatter(supervisor_formatter)
+    logger.setLevel(logging.INFO)
+    logger.addHandler(supervisor_handler)
+
+    admit = Admission(config.NODE_MIN_AVAILABLE_MEMORY, config.NODE_MAX_LOAD, config.NODE_SETTLE_TIME)
+
+    def start(worker_id: str) -> mp.Process:
+        process = mp.Process(target=node_worker, args=(worker_id, log_queue, admit))
+        process.start()
+        logger.info(f"Started worker '{worker_id}' (PID: {process.pid}).")
+        return process
+
+    processes = {f"{node_name}-{i}": start(f"{node_name}-{i}") for i in range(workers)}
+
+    try:
+        while processes:
+            time.sleep(config.NODE_POLL_INTERVAL)
+
+            for worker_id, process in list(processes.items()):
+                if process.exitcode is None:
+                    continue
+
+                if process.exitcode == 0:  # Queue is empty
+                    logger.info(f"Worker '{worker_id}' finished.")
+                    del processes[worker_id]
+                else:
+                    logger.error(f"Worker '{worker_id}' crashed with exit code {process.exitcode}. Restarting...")
+                    processes[worker_id] = start(worker_id)
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join(config.TERMINATE_TIMEOUT)
+
+        listener.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run multiple crawl workers on this node without Slurm.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=max(1, len(os.sched_getaffinity(0)) // 2),
+        help="Number of concurrent workers. Defaults to half the number of CPUs.",
+    )
+    args = parser.parse_args()
+
+    main(args.workers)
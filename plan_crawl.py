@@ -0,0 +1,156 @@
+import argparse
+import os
+import pathlib
+import random
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any
+
+from utils.results_log import read_results
+from utils.work_queue import WorkQueue
+import config
+
+"""
+Estimate the wall time and storage of a full crawl from a small sample crawl.
+
+The sample is crawled with the normal crawler under the crawl name
+`<CRAWL_NAME>-plan`, so it does not touch the data of the real crawl.
+"""
+
+HAR_NAMES = {f"{arm}{extension}" for arm in ("baseline", "control", "experimental") for extension in (".json.gz", ".json")}
+
+
+def artifact_type(path: pathlib.Path) -> str:
+    """
+    Return the artifact type of a file in a domain's data path.
+    """
+    if path.name in HAR_NAMES:
+        return "har"
+    if path.name == "features.json":
+        return "features"
+    if path.suffix == ".png":
+        return "screenshots"
+    return "other"
+
+
+def run_sample(sites: list[str], crawl_name: str, workers: int) -> None:
+    """
+    Crawl `sites` under `crawl_name`.
+
+    Args:
+        sites: Sites to crawl.
+        crawl_name: Name of the sample crawl.
+        workers: Number of concurrent workers. node_main.py is used if greater than 1.
+    """
+    data_path = pathlib.Path(config.DATA_PATH).parent / crawl_name
+    data_path.mkdir(parents=True, exist_ok=False)
+
+    # Paths mirror config.py with the sample crawl name
+    WorkQueue(str(data_path / "queue.sqlite"), config.QUEUE_VISIBILITY_TIMEOUT, config.QUEUE_MAX_ATTEMPTS).enqueue(sites)
+
+    env = dict(os.environ, CRAWL_NAME=crawl_name)
+    if workers > 1:
+        command = [sys.executable, "node_main.py", "--workers", str(workers)]
+    else:
+        command = [sys.executable, "main.py"]
+    subprocess.run(command, env=env, check=True)
+
+
+def summarize(results: dict[str, Any]) -> dict[str, Any]:
+    """
+    Summarize per-site time, failure rate, and bytes written per artifact type of a sample crawl.
+
+    Args:
+        results: Results of the sample crawl (see `read_results`).
+    """
+    times = [result["total_time"] for result in results.values() if result.get("total_time") is not None]
+
+    failures = {
+        "landing_page_down": sum(bool(result.get("landing_page_down")) for result in results.values()),
+        "unexpected_exception": sum(bool(result.get("unexpected_exception")) for result in results.values()),
+        "killed": sum(bool(result.get("SIGKILL") or result.get("stalled")) for result in results.values()),
+    }
+
+    artifact_bytes: dict[str, int] = defaultdict(int)
+    for result in results.values():
+        data_path = pathlib.Path(result["data_path"])
+        if not data_path.is_dir():
+            continue
+
+        for path in data_path.rglob("*"):
+            if path.is_file():
+                artifact_bytes[artifact_type(path)] += path.stat().st_size
+
+    return {
+        "sites": len(results),
+        "mean_time": statistics.mean(times) if times else 0,
+        "stdev_time": statistics.stdev(times) if len(times) > 1 else 0,
+        "failure_rates": {name: count / len(results) for name, count in failures.items()},
+        "bytes_per_site": {name: total / len(results) for name, total in artifact_bytes.items()},
+    }
+
+
+def extrapolate(summary: dict[str, Any], total_sites: int, workers: int, workers_per_node: int) -> dict[str, float]:
+    """
+    Extrapolate a sample crawl summary to the full site list.
+
+    Args:
+        summary: Output of `summarize`.
+        total_sites: Number of sites in the full site list.
+        workers: Number of concurrent workers for the full crawl.
+        workers_per_node: Number of workers that fit on one node.
+
+    Returns:
+        Worker-hours, node-hours, wall-clock hours, and terabytes of the full crawl.
+    """
+    worker_hours = total_sites * summary["mean_time"] / 3600
+
+    return {
+        "worker_hours": worker_hours,
+        "node_hours": worker_hours / workers_per_node,
+        "wall_hours": worker_hours / workers,
+        "terabytes": total_sites * sum(summary["bytes_per_site"].values()) / 1e12,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate wall time and storage of a full crawl from a sample crawl.")
+    parser.add_argument("--sample", type=int, default=50, help="Number of sites to crawl in the sample.")
+    parser.add_argument("--sample-workers", type=int, default=1, help="Number of concurrent workers for the sample crawl.")
+    parser.add_argument("--workers", type=int, required=True, help="Number of concurrent workers for the full crawl.")
+    parser.add_argument("--workers-per-node", type=int, default=1, help="Number of workers that fit on one node.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-crawl", action="store_true", help="Summarize an existing sample crawl.")
+    args = parser.parse_args()
+
+    sites = []
+    with open(config.SITE_LIST_PATH) as file:
+        for line in file:
+            sites.append(line.strip())
+
+    crawl_name = f"{config.CRAWL_NAME}-plan"
+    if not args.skip_crawl:
+        sample = random.Random(args.seed).sample(sites, min(args.sample, len(sites)))
+        run_sample(sample, crawl_name, args.sample_workers)
+
+    results = read_results(pathlib.Path(config.DATA_PATH).parent / crawl_name / "results")
+    if not results:
+        print("The sample crawl has no results.")
+        exit(1)
+
+    summary = summarize(results)
+    estimate = extrapolate(summary, len(sites), args.workers, args.workers_per_node)
+
+    print(f"Sample: {summary['sites']} sites, {summary['mean_time']:.0f} ± {summary['stdev_time']:.0f} seconds per site.")
+    for name, rate in summary["failure_rates"].items():
+        print(f"  {name}: {rate:.1%}")
+    for name, size in sorted(summary["bytes_per_site"].items()):
+        print(f"  {name}: {size / 1e6:.1f} MB per site")
+    print()
+
+    print(f"Full crawl: {len(sites)} sites with {args.workers} workers.")
+    print(f"  {estimate['worker_hours']:.0f} worker-hours ({estimate['node_hours']:.0f} node-hours)")
+    print(f"  {estimate['wall_hours']:.1f} hours wall time")
+    print(f"  {estimate['terabytes']:.2f} TB")
@@ -0,0 +1,112 @@
+import asyncio
+import http.server
+import socket
+import threading
+
+from utils.prefilter import Prefilter
+
+"""
+Test the prefilter (see utils/prefilter.py) against a local HTTP server and DNS stand-in.
+
+The stand-in resolves a few made-up domains to localhost and fails for all others.
+HTTPS connections go to a closed local port, so they are refused.
+"""
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Serve a page on `www.` hosts, redirect bare hosts to `www.`, and return 404 for `missing.test`.
+    """
+
+    def do_GET(self) -> None:
+        host = self.headers["Host"]
+        if host.startswith("missing.test"):
+            self.send_response(404)
+        elif host.startswith("www."):
+            self.send_response(200)
+        else:
+            self.send_response(301)
+            self.send_header("Location", f"http://www.{host}{self.path}")
+        self.end_headers()
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def closed_port() -> int:
+    """
+    Return a local port with nothing listening on it.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+HOSTS = {
+    "redirect.test": "127.0.0.1",
+    "www.redirect.test": "127.0.0.1",
+    "missing.test": "127.0.0.1",
+    "refused.test": "127.0.0.1",
+    **{f"{prefix}queued{i}.test": "127.0.0.1" for i in range(4) for prefix in ("", "www.")},
+}
+
+# Hosts with several addresses. 127.0.0.2 is a loopback address nothing listens on
+MULTI_HOSTS = {
+    "fallback.test": ["127.0.0.2", "127.0.0.1"],
+    "www.fallback.test": ["127.0.0.2", "127.0.0.1"],
+}
+
+
+async def resolve(host: str) -> list[str]:
+    """
+    DNS stand-in.
+    """
+    host = host.split(":")[0]
+    if host in MULTI_HOSTS:
+        return MULTI_HOSTS[host]
+    if host not in HOSTS:
+        raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+    return [HOSTS[host]]
+
+
+async def slow_resolve(host: str) -> list[str]:
+    """
+    DNS stand-in that takes 0.3 seconds per lookup.
+    """
+    await asyncio.sleep(0.3)
+    return await resolve(host)
+
+
+if __name__ == "__main__":
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    prefilter = Prefilter(resolve=resolve, ports={"http": server.server_address[1], "https": closed_port()}, timeout=2)
+    results = asyncio.run(prefilter.check_all(["redirect.test", "missing.test", "nxdomain.test", "fallback.test"]))
+
+    # refused.test has no HTTP server either
+    prefilter_refused = Prefilter(resolve=resolve, ports={"http": closed_port(), "https": closed_port()}, timeout=2)
+    results.update(asyncio.run(prefilter_refused.check_all(["refused.test"])))
+
+    # One lookup at a time: later lookups wait longer than the timeout before they start
+    prefilter_queued = Prefilter(resolve=slow_resolve, ports={"http": closed_port(), "https": closed_port()}, timeout=1)
+    prefilter_queued.dns_concurrency = 1
+    results.update(asyncio.run(prefilter_queued.check_all([f"queued{i}.test" for i in range(4)])))
+    server.shutdown()
+
+    for domain, result in results.items():
+        print(f"{domain}: {result}")
+    print()
+
+    print("Expected http://redirect.test -> http://www.redirect.test/ (HTTPS refused, bare host redirects)")
+    print(results["redirect.test"]["url"], "->", results["redirect.test"]["final_url"])
+    print("Expected False (404 is a response)")
+    print(results["missing.test"]["dead"])
+    print("Expected True, with http:// variants skipped after their hosts failed DNS")
+    print(results["nxdomain.test"]["dead"], results["nxdomain.test"]["failures"])
+    print("Expected True")
+    print(results["refused.test"]["dead"])
+    print("Expected http://fallback.test -> http://www.fallback.test/ (first address refused, second accepted)")
+    print(results["fallback.test"]["url"], "->", results["fallback.test"]["final_url"])
+    print("Expected connection_refused for every queued site (lookups waiting for a DNS slot do not time out)")
+    print([results[f"queued{i}.test"]["failures"][f"https://queued{i}.test"] for i in range(4)])
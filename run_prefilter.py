@@ -0,0 +1,56 @@
+import argparse
+import asyncio
+import time
+
+from crawler import CrawlDataEncoder, CrawlResults
+from utils.prefilter import Prefilter, write_prefilter
+from utils.results_log import ResultsLog
+from utils.work_queue import WorkQueue
+import config
+
+"""
+Prefilter the pending sites in the crawl queue without a browser.
+
+The working URL variant of each site is cached in PREFILTER_PATH, where
+crawl workers find it (see Crawler.resolve_domain). Dead sites are
+recorded as `landing_page_down` and removed from the queue.
+
+Run before starting the workers, e.g., with `sbatch_main.py --prefilter`.
+"""
+
+
+def prefilter(timeout: float, concurrency: int) -> None:
+    """
+    Check all pending sites, cache the results, and complete dead sites.
+    """
+    queue = WorkQueue(config.QUEUE_PATH, config.QUEUE_VISIBILITY_TIMEOUT, config.QUEUE_MAX_ATTEMPTS)
+    domains = queue.domains()
+
+    start_time = time.time()
+    reachability = asyncio.run(Prefilter(timeout=timeout, concurrency=concurrency).check_all(domains))
+    write_prefilter(config.PREFILTER_PATH, reachability)
+
+    results = ResultsLog(config.RESULTS_PATH, shard="prefilter", cls=CrawlDataEncoder)
+    dead = [domain for domain, result in reachability.items() if result["dead"]]
+    for domain in dead:
+        result: CrawlResults = {
+            "url": None,
+            "data_path": f"{config.DATA_PATH}{domain}/",
+            "landing_page_down": True,
+            "unexpected_exception": False,
+            "resolution_failures": reachability[domain]["failures"],  # type: ignore[typeddict-item]
+            "prefiltered": True,
+        }
+        results.append(domain, result)
+        queue.ack(domain)
+
+    print(f"Checked {len(domains)} sites in {time.time() - start_time:.0f} seconds. {len(dead)} are down.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check DNS and reachability of pending sites without a browser.")
+    parser.add_argument("--timeout", type=float, default=10, help="Seconds allowed for each of DNS, connecting, and responding.")
+    parser.add_argument("--concurrency", type=int, default=500, help="Number of sites checked at once.")
+    args = parser.parse_args()
+
+    prefilter(args.timeout, args.concurrency)
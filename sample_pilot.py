@@ -0,0 +1,156 @@
+import argparse
+import json
+import math
+import pathlib
+import random
+from collections import defaultdict
+from collections.abc import Hashable
+from typing import Any, Optional
+
+from utils.results_log import read_results
+from utils.work_queue import WorkQueue
+import config
+
+"""
+Build a stratified pilot crawl from one or more ranked site lists.
+
+Sites are grouped into strata by Tranco rank tier and, when available,
+by website category and by failure class in a prior crawl. Each stratum
+contributes to the pilot in proportion to its size (and at least one site),
+so a small pilot still covers every kind of site in the full crawl.
+
+For a separate pilot crawl, set the CRAWL_NAME environment variable, e.g.:
+CRAWL_NAME=pilot python3 sample_pilot.py --fraction 0.01
+CRAWL_NAME=pilot python3 node_main.py
+"""
+
+
+def read_site_list(path: str) -> list[str]:
+    """
+    Read a ranked site list, skipping header lines (e.g., the "1" in top_mid_bom/*.csv).
+    """
+    sites = []
+    with open(path) as file:
+        for line in file:
+            site = line.strip()
+            if site and not site.isdigit():
+                sites.append(site)
+    return sites
+
+
+def rank_tier(rank: int) -> str:
+    """
+    Return the Tranco rank tier of a rank (top 10, top 100, top 1k, ...).
+    """
+    return f"top {10 ** math.ceil(math.log10(max(rank, 2))):,}"
+
+
+def read_categories(path: str) -> dict[str, str]:
+    """
+    Read the top-level website category of each domain from Cloudflare Domain Intelligence output (see categorize.ipynb).
+    """
+    with open(path) as file:
+        all_domain_intelligence = json.load(file)
+
+    categories = {}
+    for domain_intelligence in all_domain_intelligence:
+        names = [
+            category["name"]
+            for category in domain_intelligence.get("content_categories", [])
+            if "super_category_id" not in category
+        ]
+        categories[domain_intelligence["domain"]] = names[0] if names else "Uncategorized"
+    return categories
+
+
+def failure_class(result: Optional[dict[str, Any]]) -> str:
+    """
+    Return how a site fared in a prior crawl.
+    """
+    if result is None:
+        return "unseen"
+    if result.get("SIGKILL") or result.get("stalled"):
+        return "killed"
+    if result.get("landing_page_down"):
+        return "landing_page_down"
+    if result.get("unexpected_exception"):
+        return "unexpected_exception"
+    return "success"
+
+
+def stratified_sample(strata: dict[str, Hashable], size: int, seed: int = 0) -> list[str]:
+    """
+    Sample sites proportionally from each stratum, taking at least one site per stratum.
+
+    Args:
+        strata: Dictionary mapping each site to its stratum.
+        size: Target sample size. Exceeded if there are more strata than `size`.
+        seed: Random seed. Defaults to 0.
+
+    Returns:
+        Sampled sites, interleaved across strata.
+    """
+    rng = random.Random(seed)
+
+    groups: dict[Hashable, list[str]] = defaultdict(list)
+    for site, stratum in strata.items():
+        groups[stratum].append(site)
+
+    samples = []
+    for stratum in sorted(groups, key=str):
+        sites = groups[stratum]
+        k = min(len(sites), max(1, round(size * len(sites) / len(strata))))
+        samples.append(rng.sample(sites, k))
+
+    # Interleave so that a partially crawled pilot is still representative
+    pilot: list[str] = []
+    for i in range(max(map(len, samples), default=0)):
+        pilot.extend(sample[i] for sample in samples if i < len(sample))
+    return pilot
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enqueue a stratified pilot sample of the site list.")
+    parser.add_argument(
+        "--site-lists",
+        nargs="+",
+        default=[config.SITE_LIST_PATH],
+        help="Ranked site lists. If more than one is given, each list is its own tier (e.g., top_mid_bom/*.csv). "
+             "Otherwise tiers are based on rank. Defaults to config.SITE_LIST_PATH.",
+    )
+    size = parser.add_mutually_exclusive_group(required=True)
+    size.add_argument("--fraction", type=float, help="Fraction of sites to sample (e.g., 0.01).")
+    size.add_argument("--size", type=int, help="Number of sites to sample.")
+    parser.add_argument("--categories", help="Cloudflare Domain Intelligence JSON (see categorize.ipynb).")
+    parser.add_argument("--prior-results", help="Results of a prior crawl, used to stratify by failure class.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tiers: dict[str, str] = {}
+    for path in args.site_lists:
+        for rank, site in enumerate(read_site_list(path), start=1):
+            if site not in tiers:
+                tiers[site] = pathlib.Path(path).stem if len(args.site_lists) > 1 else rank_tier(rank)
+
+    categories = read_categories(args.categories) if args.categories else {}
+    prior_results = read_results(args.prior_results) if args.prior_results else None
+
+    strata: dict[str, Hashable] = {}
+    for site, tier in tiers.items():
+        stratum: tuple[str, ...] = (tier,)
+        if args.categories:
+            stratum += (categories.get(site, "Uncategorized"),)
+        if prior_results is not None:
+            stratum += (failure_class(prior_results.get(site)),)
+        strata[site] = stratum
+
+    sample_size = args.size if args.size is not None else math.ceil(args.fraction * len(strata))
+    pilot = stratified_sample(strata, sample_size, args.seed)
+
+    pathlib.Path(config.DATA_PATH).mkdir(parents=True, exist_ok=True)
+    with open(config.DATA_PATH + "pilot.txt", "w") as file:
+        file.write("\n".join(pilot) + "\n")
+
+    queue = WorkQueue(config.QUEUE_PATH, config.QUEUE_VISIBILITY_TIMEOUT, config.QUEUE_MAX_ATTEMPTS)
+    added = queue.enqueue(pilot)
+    print(f"Enqueued {added}/{len(pilot)} pilot sites from {len(set(strata.values()))} strata into '{config.QUEUE_PATH}'.")
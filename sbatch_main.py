@@ -3,8 +3,10 @@ import config
 import yaml
 import argparse
 import pathlib
-from filelock import Timeout, FileLock
-import json
+from run_prefilter import prefilter
+from utils.results_log import read_results
+from utils.site_cost import order_by_cost
+from utils.work_queue import WorkQueue
 
 def init():
     """
@@ -14,8 +16,7 @@ def init():
     pathlib.Path(config.DATA_PATH).mkdir(parents=True, exist_ok=False)
 
     # Initialize results
-    with open(config.RESULTS_PATH, 'w') as f:
-        f.write("{}")
+    pathlib.Path(config.RESULTS_PATH).mkdir()
         
     # Initialize meta.yaml
     config_dict = {
@@ -35,18 +36,30 @@ def init():
     # Copy sites.txt to crawl path
     os.system(f'copy {config.SITE_LIST_PATH} {config.DATA_PATH}')
 
-    # Write sites to queue with lock
+    # Write sites to queue
     sites = []
     with open(config.SITE_LIST_PATH) as file:
         for line in file:
             sites.append(line.strip())
-    queue_path = config.QUEUE_PATH
-    queue_lock = FileLock(queue_path + '.lock', timeout=10)
-    with queue_lock:
-        with open(queue_path, 'w') as f:
-            json.dump(sites, f)
+    queue = WorkQueue(config.QUEUE_PATH, config.QUEUE_VISIBILITY_TIMEOUT, config.QUEUE_MAX_ATTEMPTS)
+    queue.enqueue(sites)
 
-def sbatch_run(command: str, job_name: str, jobs: str, memory: int, cpus: int):
+def order_queue(prior_results: list[str]):
+    """
+    Order the queue so that sites expected to take the longest are crawled first.
+
+    Args:
+        prior_results: Paths to the results of prior crawls (see `read_results`).
+    """
+    sites = []
+    with open(config.SITE_LIST_PATH) as file:
+        for line in file:
+            sites.append(line.strip())
+
+    queue = WorkQueue(config.QUEUE_PATH, config.QUEUE_VISIBILITY_TIMEOUT, config.QUEUE_MAX_ATTEMPTS)
+    queue.reorder(order_by_cost(sites, [read_results(path) for path in prior_results]))
+
+def sbatch_run(command: str, job_name: str, jobs: str, memory: int, cpus: int, sbatch: str = "sbatch"):
     """
     Create a temporary bash script and run it with sbatch.
 
@@ -56,6 +69,7 @@ def sbatch_run(command: str, job_name: str, jobs: str, memory: int, cpus: int):
         jobs: The number of jobs to run. Must be in array format (e.g. 1-25).
         memory: The amount of memory to allocate to each job.
         cpus: The number of cpus to allocate to each job.
+        sbatch: The sbatch command. Defaults to "sbatch".
     """
     # Create directory for slurm logs
     if not os.path.exists(config.SLURM_LOG_PATH):
@@ -89,7 +103,7 @@ def sbatch_run(command: str, job_name: str, jobs: str, memory: int, cpus: int):
         f.write('\n'.join(shFile))
 
     # Run bash script with sbatch
-    os.system('sbatch %s' % shFileName)
+    os.system('%s %s' % (sbatch, shFileName))
 
 if __name__ == "__main__":    
     if input("This is a destructive action if worker arrays are not disjoint. Are you sure you want to continue? (y/n) ") != "y":
@@ -106,10 +120,27 @@ if __name__ == "__main__":
         '--skip-init',
         action='store_true',
     )
+    parser.add_argument(
+        '--prior-results',
+        nargs='+',
+        default=[],
+        help="Results of prior crawls, used to crawl the slowest sites first.",
+    )
+    parser.add_argument(
+        '--prefilter',
+        action='store_true',
+        help="Check DNS and reachability of all sites without a browser before crawling (see run_prefilter.py).",
+    )
     args = parser.parse_args()
     
     if not args.skip_init:
         init()
 
+    if args.prefilter:
+        prefilter(timeout=10, concurrency=500)
+
+    if args.prior_results:
+        order_queue(args.prior_results)
+
     # subprocess.run(f'python3 main.py --jobs {args.jobs}', shell=True)
     sbatch_run(f'python3 main.py', job_name='cookie', jobs=args.jobs, memory=4, cpus=2)
\ No newline at end of file
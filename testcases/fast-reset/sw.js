@@ -0,0 +1,3 @@
+// Fixture service worker. Takes control of the page so a leftover registration is observable.
+self.addEventListener("install", () => self.skipWaiting());
+self.addEventListener("activate", event => event.waitUntil(self.clients.claim()));
@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from urllib.parse import urlparse
+import sqlite3
+
+from utils.url import URL
+
+"""
+Crawl-wide index of resolved landing page URLs.
+
+Many sites in the site list are aliases of each other (e.g., country TLDs
+and brand domains) that redirect to the same landing page. The first
+domain whose crawl of a landing page completes claims it, and later
+domains that resolve to it are recorded as aliases instead of being
+crawled again. A failed crawl claims nothing, so the landing page is
+crawled again for the next domain that resolves to it.
+
+URLs are keyed by their normalized form (see utils/url.py), which
+ignores the scheme, port, and fragment. The query is kept, since it
+tells apart pages behind the same path (e.g., consent or login walls
+that redirect to `/?return=...`).
+"""
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS aliases (
+        url TEXT PRIMARY KEY,
+        domain TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS aliases_domain ON aliases (domain)",
+)
+
+
+def normalize(url: str) -> str:
+    """
+    Return the key of a URL in the index.
+    """
+    return URL(url).parts_to_compare._replace(query=urlparse(url).query).geturl()
+
+
+class AliasIndex:
+    """
+    Map resolved landing page URLs to the domain whose crawl covers them.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path: Path of the SQLite database. Created if it does not exist.
+        """
+        self.path = path
+
+        with self._transaction() as db:
+            for statement in SCHEMA:
+                db.execute(statement)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Open a connection and hold the database write lock for the duration of the block.
+
+        A new connection is opened for every transaction so that an AliasIndex
+        can safely be shared with forked worker processes.
+        """
+        db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    def owner(self, url: str) -> Optional[str]:
+        """
+        Return the domain that claimed a resolved URL, or None if it is unclaimed.
+        """
+        with self._transaction() as db:
+            row = db.execute("SELECT domain FROM aliases WHERE url = ?", (normalize(url),)).fetchone()
+        return row[0] if row is not None else None
+
+    def claim(self, url: str, domain: str) -> Optional[str]:
+        """
+        Claim a resolved URL for a domain unless another domain already has.
+        Only claim a URL once the domain's crawl of it has completed.
+
+        Args:
+            url: URL the domain resolved to.
+            domain: The domain being crawled.
+
+        Returns:
+            The domain that claimed the URL first, or None if `domain` holds the claim.
+        """
+        with self._transaction() as db:
+            key = normalize(url)
+            db.execute("INSERT OR IGNORE INTO aliases (url, domain) VALUES (?, ?)", (key, domain))
+            owner = db.execute("SELECT domain FROM aliases WHERE url = ?", (key,)).fetchone()[0]
+        return None if owner == domain else owner
+
+    def aliases(self) -> dict[str, str]:
+        """
+        Return a dictionary mapping each claimed URL key to its domain.
+        """
+        with self._transaction() as db:
+            rows = db.execute("SELECT url, domain FROM aliases").fetchall()
+        return dict(rows)
@@ -0,0 +1,250 @@
+from collections.abc import Iterator
+from typing import Any, Optional, Union
+import os
+import threading
+
+from seleniumwire.request import Request, Response
+from seleniumwire.storage import InMemoryRequestStorage, RequestStorage
+import config
+
+"""
+Bounded request capture for seleniumwire.
+
+By default, seleniumwire pickles every request, response body, and HAR
+entry of a browser to disk, and `driver.requests` unpickles all of them
+on every call (e.g., in Crawler.main_document).
+
+A CapturePolicy limits what is stored:
+1. Response bodies are only stored for some content types and up to a
+   maximum size. Other responses, including all media, are stored
+   header-only: status, headers, cookies, and sizes are kept, in both
+   `driver.requests` and the HAR entries.
+2. Captured requests are kept in memory up to a limit. Past the limit,
+   new requests spill to seleniumwire's disk storage until the captured
+   requests are cleared (`del driver.requests`).
+
+Only the stored copies are affected. The browser always gets the full response.
+"""
+
+HEADER_ONLY_TYPES = ("image/", "video/", "audio/", "font/")
+
+
+class CapturePolicy:
+    """
+    What seleniumwire stores of each request.
+    """
+
+    def __init__(
+            self,
+            body_types: Optional[tuple[str, ...]] = None,
+            header_only_types: tuple[str, ...] = HEADER_ONLY_TYPES,
+            max_body_size: Optional[int] = None,
+            memory_limit: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            body_types: Content type prefixes (e.g., "text/html") whose response bodies are stored.
+                Defaults to None, where bodies of all other types than `header_only_types` are stored.
+            header_only_types: Content type prefixes whose response bodies are never stored. Defaults to media and fonts.
+            max_body_size: Largest response body (bytes) that is stored. Defaults to None, for no limit.
+            memory_limit: Bytes of captured requests kept in memory before new requests spill to disk.
+                Defaults to None, for no limit.
+        """
+        self.body_types = body_types
+        self.header_only_types = header_only_types
+        self.max_body_size = max_body_size
+        self.memory_limit = memory_limit
+
+    def store_body(self, content_type: str, size: int) -> bool:
+        """
+        Return True iff the body of a response with the given Content-Type and body size (bytes) is stored.
+        """
+        content_type = content_type.lower()
+        if content_type.startswith(self.header_only_types):
+            return False
+        if self.body_types is not None and not content_type.startswith(self.body_types):
+            return False
+        return self.max_body_size is None or size <= self.max_body_size
+
+    @classmethod
+    def from_config(cls) -> Optional["CapturePolicy"]:
+        """
+        Return the capture policy set in config.py, or None if it is disabled.
+        """
+        if not config.CAPTURE_POLICY:
+            return None
+
+        return cls(
+            body_types=tuple(config.CAPTURE_BODY_TYPES) if config.CAPTURE_BODY_TYPES is not None else None,
+            max_body_size=config.CAPTURE_MAX_BODY_SIZE * 1024**2 if config.CAPTURE_MAX_BODY_SIZE is not None else None,
+            memory_limit=config.CAPTURE_MEMORY_LIMIT * 1024**2 if config.CAPTURE_MEMORY_LIMIT is not None else None,
+        )
+
+
+class BoundedStorage:
+    """
+    seleniumwire request storage that applies a CapturePolicy.
+
+    Install on a driver launched with in-memory request storage:
+    `driver.backend.storage = BoundedStorage(driver.backend.storage, policy, stats)`.
+    """
+
+    def __init__(self, memory: InMemoryRequestStorage, policy: CapturePolicy, stats: dict[str, int]) -> None:
+        """
+        Args:
+            memory: The driver's in-memory request storage.
+            policy: What to store.
+            stats: Capture statistics, updated in place. Shared by all drivers of a crawl.
+        """
+        self.memory = memory
+        self.disk: Optional[RequestStorage] = None
+        self.policy = policy
+        self.home_dir = memory.home_dir  # Used by seleniumwire for its certificates
+
+        # Requests stored on disk since the memory limit was reached
+        self.spilled: set[str] = set()
+        self.memory_bytes = 0
+
+        self.stats = stats
+        for key in ("bodies_dropped", "bytes_dropped", "requests_spilled", "peak_memory_bytes"):
+            self.stats.setdefault(key, 0)
+
+        self._lock = threading.Lock()
+
+    def _storage(self, request_id: str) -> Union[InMemoryRequestStorage, RequestStorage]:
+        """
+        Return the storage holding a request.
+        """
+        with self._lock:
+            spilled = request_id in self.spilled
+        return self.disk if spilled and self.disk is not None else self.memory
+
+    def _count(self, size: int) -> None:
+        """
+        Add `size` bytes to the memory used by captured requests.
+        """
+        with self._lock:
+            self.memory_bytes += size
+            self.stats["peak_memory_bytes"] = max(self.stats["peak_memory_bytes"], self.memory_bytes)
+
+    def save_request(self, request: Request) -> None:
+        with self._lock:
+            spill = self.policy.memory_limit is not None and self.memory_bytes > self.policy.memory_limit
+            if spill and self.disk is None:
+                self.disk = RequestStorage(base_dir=os.path.dirname(self.home_dir))
+
+        if spill:
+            self.disk.save_request(request)  # type: ignore[union-attr]
+            with self._lock:
+                self.spilled.add(request.id)
+                self.stats["requests_spilled"] += 1
+        else:
+            self.memory.save_request(request)
+            self._count(len(request.body or b""))
+
+    def save_response(self, request_id: str, response: Response) -> None:
+        body = response.body or b""
+        if body and not self.policy.store_body(response.headers.get("Content-Type", ""), len(body)):
+            response.body = b""
+            with self._lock:
+                self.stats["bodies_dropped"] += 1
+                self.stats["bytes_dropped"] += len(body)
+
+        storage = self._storage(request_id)
+        storage.save_response(request_id, response)
+        if storage is self.memory:
+            self._count(len(response.body or b""))
+
+    def save_ws_message(self, request_id: str, message: Any) -> None:
+        self._storage(request_id).save_ws_message(request_id, message)
+
+    def save_har_entry(self, request_id: str, entry: dict) -> None:
+        content = entry["response"]["content"]
+        if "text" in content and not self.policy.store_body(content.get("mimeType", ""), content.get("size", 0)):
+            del content["text"]
+            content.pop("encoding", None)
+            content["comment"] = "Body not captured"
+
+        storage = self._storage(request_id)
+        storage.save_har_entry(request_id, entry)
+        if storage is self.memory:
+            self._count(len(content.get("text", "")))
+
+    def load_requests(self) -> list[Request]:
+        requests = self.memory.load_requests()
+        if self.disk is not None:
+            requests += self.disk.load_requests()
+        return requests
+
+    def load_last_request(self) -> Optional[Request]:
+        if self.disk is not None and self.spilled:
+            return self.disk.load_last_request()
+        return self.memory.load_last_request()
+
+    def load_har_entries(self) -> list[dict]:
+        return list(self.iter_har_entries())
+
+    def iter_har_entries(self) -> Iterator[dict]:
+        """
+        Yield the stored HAR entries one at a time, in the order of their requests.
+        """
+        yield from self.memory.load_har_entries()
+        if self.disk is not None:
+            yield from iter_disk_har_entries(self.disk)
+
+    def iter_requests(self) -> Iterator[Request]:
+        yield from self.memory.iter_requests()
+        if self.disk is not None:
+            yield from self.disk.iter_requests()
+
+    def clear_requests(self) -> None:
+        self.memory.clear_requests()
+        if self.disk is not None:
+            self.disk.clear_requests()
+
+        with self._lock:
+            self.spilled.clear()
+            self.memory_bytes = 0
+
+    def find(self, pat: str, check_response: bool = True) -> Optional[Request]:
+        request = self.memory.find(pat, check_response)
+        if request is None and self.disk is not None:
+            request = self.disk.find(pat, check_response)
+        return request
+
+    def cleanup(self) -> None:
+        self.memory.cleanup()
+        if self.disk is not None:
+            self.disk.cleanup()
+
+
+def iter_disk_har_entries(storage: RequestStorage) -> Iterator[dict]:
+    """
+    Yield the HAR entries of seleniumwire's disk storage one at a time.
+
+    Unlike `storage.load_har_entries`, entries are not all loaded at once.
+    """
+    with storage._lock:
+        index = storage._index[:]
+
+    for indexed_request in index:
+        try:
+            with open(os.path.join(storage._get_request_dir(indexed_request.id), "har_entry"), "rb") as file:
+                entry = storage._unpickle(file)
+        except FileNotFoundError:  # Not every request has a HAR entry
+            continue
+
+        if entry is not None:
+            yield entry
+
+
+def stored_har_entries(storage: Any) -> Iterator[dict]:
+    """
+    Yield the HAR entries of any seleniumwire request storage one at a time.
+    """
+    if isinstance(storage, BoundedStorage):
+        yield from storage.iter_har_entries()
+    elif isinstance(storage, RequestStorage):
+        yield from iter_disk_har_entries(storage)
+    else:
+        yield from storage.load_har_entries()
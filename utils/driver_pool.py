@@ -0,0 +1,163 @@
+from collections.abc import Callable
+from typing import Any
+import logging
+import queue
+import threading
+import time
+
+import config
+
+"""
+Pool of pre-launched web drivers.
+
+Starting Firefox, geckodriver, and the seleniumwire proxy takes several seconds.
+A background thread keeps `size` fresh drivers launched, so a crawl can take
+one instantly. Drivers are single-use: the caller quits a driver when it is done,
+and the pool launches a replacement.
+"""
+
+logger = logging.getLogger(config.LOGGER_NAME)
+
+
+class DriverPool:
+    """
+    Keep fresh web drivers launched in the background.
+    """
+
+    def __init__(self, launch: Callable[[], Any], size: int = 1, timeout: float = 120) -> None:
+        """
+        Args:
+            launch: Launches and returns a new web driver.
+            size: Number of drivers to keep launched. Defaults to 1.
+            timeout: Maximum time (seconds) to wait for a pooled driver before launching one directly. Defaults to 120.
+        """
+        self.launch = launch
+        self.timeout = timeout
+
+        self.ready: queue.Queue = queue.Queue()
+        self.slots = threading.Semaphore(size)  # Free slots in the pool
+        self.stopped = threading.Event()
+
+        # Metrics
+        self.hits = 0  # Acquisitions where a driver was ready
+        self.misses = 0  # Acquisitions that had to wait
+        self.wait_time = 0.0  # Total time (seconds) spent waiting in `acquire`
+        self.launches = 0
+        self.launch_time = 0.0  # Total time (seconds) spent launching drivers
+        self.unhealthy = 0  # Pooled drivers discarded by the health check
+
+        self.thread = threading.Thread(target=self._fill, daemon=True)
+        self.thread.start()
+
+    def _launch(self) -> Any:
+        """
+        Launch a driver and record the launch time.
+        """
+        start = time.time()
+        driver = self.launch()
+        self.launch_time += time.time() - start
+        self.launches += 1
+        return driver
+
+    def _fill(self) -> None:
+        """
+        Launch a driver whenever a slot is free.
+        """
+        while True:
+            self.slots.acquire()
+            if self.stopped.is_set():
+                return
+
+            try:
+                driver = self._launch()
+            except Exception:  # skipcq: PYL-W0703
+                logger.exception("Failed to launch pooled driver. Retrying...")
+                self.slots.release()
+                time.sleep(5)
+                continue
+
+            if self.stopped.is_set():
+                driver.quit()
+                return
+
+            self.ready.put(driver)
+
+    @staticmethod
+    def is_healthy(driver: Any) -> bool:
+        """
+        Return True iff the driver's browser session is responsive.
+        """
+        try:
+            return driver.execute_script("return 1;") == 1
+        except Exception:  # skipcq: PYL-W0703
+            return False
+
+    def acquire(self) -> Any:
+        """
+        Return a fresh driver, waiting for the pool if necessary.
+
+        The caller owns the driver and must quit it after use.
+        """
+        start = time.time()
+        hit = not self.ready.empty()
+
+        while True:
+            remaining = self.timeout - (time.time() - start)
+            try:
+                driver = self.ready.get(timeout=max(remaining, 0))
+            except queue.Empty:
+                logger.warning(f"No pooled driver after {self.timeout} seconds. Launching directly.")
+                driver = self._launch()
+                break
+
+            self.slots.release()  # Launch a replacement
+
+            if self.is_healthy(driver):
+                break
+
+            logger.warning("Discarding unresponsive pooled driver.")
+            self.unhealthy += 1
+            hit = False
+            try:
+                driver.quit()
+            except Exception:  # skipcq: PYL-W0703
+                pass
+
+        self.wait_time += time.time() - start
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        return driver
+
+    def close(self) -> None:
+        """
+        Stop launching drivers and quit all idle drivers.
+        """
+        self.stopped.set()
+        self.slots.release()  # Wake the fill thread
+        self.thread.join(timeout=self.timeout)
+
+        while True:
+            try:
+                driver = self.ready.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                driver.quit()
+            except Exception:  # skipcq: PYL-W0703
+                pass
+
+    def stats(self) -> dict[str, float]:
+        """
+        Return pool metrics.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "wait_time": self.wait_time,
+            "launches": self.launches,
+            "launch_time": self.launch_time,
+            "unhealthy": self.unhealthy,
+        }
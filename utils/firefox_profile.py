@@ -0,0 +1,226 @@
+from typing import Any
+import logging
+import os
+import pathlib
+import shutil
+import subprocess
+import tempfile
+
+import config
+
+"""
+Pre-tuned template Firefox profile.
+
+A fresh profile pays first-run costs on every launch: profile creation,
+safebrowsing and update checks, telemetry, captive-portal detection, and
+prefetching. The template profile is initialized once per node with these
+turned off and a bounded number of content processes, and each browser is
+launched with a clone of it.
+
+Only background services are disabled. Cookie, storage, and tracking
+protection preferences are left at their defaults, since those are what
+the crawl measures.
+"""
+
+logger = logging.getLogger(config.LOGGER_NAME)
+
+TEMPLATE_PREFS: dict[str, Any] = {
+    # First run and startup pages
+    "browser.shell.checkDefaultBrowser": False,
+    "browser.startup.homepage_override.mstone": "ignore",
+    "browser.aboutwelcome.enabled": False,
+    "startup.homepage_welcome_url": "about:blank",
+    "startup.homepage_welcome_url.additional": "",
+    "browser.newtabpage.enabled": False,
+    "browser.newtabpage.activity-stream.feeds.snippets": False,
+    "browser.newtabpage.activity-stream.feeds.topsites": False,
+    "browser.newtabpage.activity-stream.showSponsored": False,
+    "browser.newtabpage.activity-stream.showSponsoredTopSites": False,
+    "trailhead.firstrun.didSeeAboutWelcome": True,
+
+    # Safebrowsing
+    "browser.safebrowsing.malware.enabled": False,
+    "browser.safebrowsing.phishing.enabled": False,
+    "browser.safebrowsing.blockedURIs.enabled": False,
+    "browser.safebrowsing.downloads.enabled": False,
+    "browser.safebrowsing.downloads.remote.enabled": False,
+    "browser.safebrowsing.provider.google.updateURL": "",
+    "browser.safebrowsing.provider.google4.updateURL": "",
+    # The Mozilla provider and remote settings are kept: they serve the tracking protection
+    # lists and other data that change which cookies a site can set
+
+    # Updates
+    "app.update.auto": False,
+    "app.update.enabled": False,
+    "app.update.checkInstallTime": False,
+    "extensions.update.enabled": False,
+    "extensions.getAddons.cache.enabled": False,
+    "browser.search.update": False,
+
+    # Telemetry and studies
+    "toolkit.telemetry.enabled": False,
+    "toolkit.telemetry.unified": False,
+    "toolkit.telemetry.archive.enabled": False,
+    "toolkit.telemetry.server": "",
+    "datareporting.healthreport.uploadEnabled": False,
+    "datareporting.policy.dataSubmissionEnabled": False,
+    "browser.ping-centre.telemetry": False,
+    "app.shield.optoutstudies.enabled": False,
+    "app.normandy.enabled": False,
+    "browser.discovery.enabled": False,
+    "breakpad.reportURL": "",
+    "browser.tabs.crashReporting.sendReport": False,
+
+    # Captive portal and connectivity checks
+    "network.captive-portal-service.enabled": False,
+    "network.connectivity-service.enabled": False,
+
+    # Speculative connections and prefetching
+    "network.prefetch-next": False,
+    "network.dns.disablePrefetch": True,
+    "network.predictor.enabled": False,
+    "network.http.speculative-parallel-limit": 0,
+    "browser.urlbar.speculativeConnect.enabled": False,
+    "browser.places.speculativeConnect.enabled": False,
+
+    # Content processes. Set per template by `build_template`
+    "dom.ipc.processPrelaunch.enabled": False,
+}
+
+# Per-site state that must not be carried from the template into a crawl
+STATE = [
+    "cookies.sqlite*",
+    "webappsstore.sqlite*",
+    "places.sqlite*",
+    "favicons.sqlite*",
+    "formhistory.sqlite*",
+    "permissions.sqlite*",
+    "content-prefs.sqlite*",
+    "storage",
+    "cache2",
+    "sessionstore*",
+    "serviceworker.txt",
+    "SiteSecurityServiceState.txt",
+    "lock",
+    ".parentlock",
+]
+
+# Files Firefox only reads or replaces atomically, which are safe to share between clones via hardlinks.
+# Everything else (e.g., SQLite databases, which are written in place, and user.js, which geckodriver edits) is copied.
+LINKABLE = {
+    "prefs.js",
+    "times.json",
+    "compatibility.ini",
+    "extensions.json",
+    "addonStartup.json.lz4",
+    "search.json.mozlz4",
+    "handlers.json",
+    "xulstore.json",
+}
+LINKABLE_DIRS = {"startupCache"}
+
+
+def template_path(process_count: int) -> str:
+    """
+    Return the path of the template profile on this node.
+
+    Templates are kept on local disk, since clones must be on the same filesystem to be hardlinked.
+    """
+    return os.path.join(tempfile.gettempdir(), f"firefox-template-{config.CRAWL_NAME}-{process_count}")
+
+
+def write_prefs(path: str, prefs: dict[str, Any]) -> None:
+    """
+    Write preferences to a profile's user.js.
+    """
+    lines = []
+    for name, value in prefs.items():
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        elif isinstance(value, str):
+            value = f'"{value}"'
+        lines.append(f'user_pref("{name}", {value});\n')
+
+    with open(os.path.join(path, "user.js"), "w") as file:
+        file.writelines(lines)
+
+
+def build_template(process_count: int = 2, firefox: str = "firefox", timeout: float = 60) -> str:
+    """
+    Build the template profile if it does not exist yet and return its path.
+
+    Safe to call from concurrent workers: the template is built in a temporary
+    directory and moved into place atomically.
+
+    Args:
+        process_count: Maximum number of web content processes. Defaults to 2.
+        firefox: The Firefox executable. Defaults to "firefox".
+        timeout: Maximum time (seconds) to let Firefox initialize the profile. Defaults to 60.
+    """
+    path = template_path(process_count)
+    if os.path.isdir(path):
+        return path
+
+    build_path = tempfile.mkdtemp(prefix=os.path.basename(path) + "-", dir=os.path.dirname(path))
+    try:
+        prefs = dict(TEMPLATE_PREFS)
+        prefs["dom.ipc.processCount"] = process_count
+        prefs["dom.ipc.processCount.webIsolated"] = 1  # Per site, with Fission enabled
+        write_prefs(build_path, prefs)
+
+        # Let Firefox create the profile's databases and caches once
+        try:
+            subprocess.run(
+                [firefox, "--headless", "--no-remote", "--profile", build_path, "--screenshot", os.path.join(build_path, "first-run.png"), "about:blank"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=timeout,
+                check=False,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            logger.warning("Failed to initialize template profile with Firefox. Using preferences only.", exc_info=True)
+
+        profile = pathlib.Path(build_path)
+        (profile / "first-run.png").unlink(missing_ok=True)
+        for pattern in STATE:
+            for state in profile.glob(pattern):
+                if state.is_dir():
+                    shutil.rmtree(state)
+                else:
+                    state.unlink()
+
+        os.rename(build_path, path)
+        logger.info(f"Built template profile '{path}'.")
+    except OSError:
+        shutil.rmtree(build_path, ignore_errors=True)
+        if not os.path.isdir(path):  # Not built concurrently by another worker
+            raise
+
+    return path
+
+
+def clone_template(template: str) -> str:
+    """
+    Clone a template profile into a new temporary directory and return its path.
+
+    Read-only files are hardlinked and all other files are copied. The caller removes the clone.
+    """
+    clone = tempfile.mkdtemp(prefix="firefox-profile-")
+
+    for root, dirs, files in os.walk(template):
+        relative = os.path.relpath(root, template)
+        linkable_dir = relative.split(os.sep)[0] in LINKABLE_DIRS
+        for name in dirs:
+            os.mkdir(os.path.join(clone, relative, name))
+        for name in files:
+            source = os.path.join(root, name)
+            destination = os.path.join(clone, relative, name)
+            if linkable_dir or (relative == "." and name in LINKABLE):
+                try:
+                    os.link(source, destination)
+                    continue
+                except OSError:
+                    pass
+            shutil.copy2(source, destination)
+
+    return clone
@@ -0,0 +1,111 @@
+from collections.abc import Iterable, Iterator
+from typing import Any
+import gzip
+import json
+import os
+
+"""
+Streaming HAR files.
+
+HAR files are written gzip-compressed with one entry per line, so that
+neither writing nor reading holds more than one entry in memory:
+
+    {"log": {"version": "1.2", "creator": {...}, "entries": [
+    {...},
+    {...}
+    ]}}
+
+The files remain valid JSON. Uncompressed HAR files (`.json`) of older
+crawls are read with `json.load` instead.
+"""
+
+HAR_EXTENSION = ".json.gz"
+HAR_VERSION = "1.2"
+COMPRESS_LEVEL = 6  # gzip level. Level 9 is several times slower for a few percent smaller files
+
+
+class HarWriter:
+    """
+    Write the entries of a HAR file one at a time.
+
+    Use as a context manager, which completes the file on exit.
+    """
+
+    def __init__(self, path: str, creator: dict[str, Any]) -> None:
+        """
+        Args:
+            path: Path of the HAR file. Must end with `.json.gz`.
+            creator: Creator of the HAR log (see the HAR specification).
+        """
+        if not path.lower().endswith(HAR_EXTENSION):
+            raise ValueError(f"File extension must be `{HAR_EXTENSION}`.")
+
+        self.file = gzip.open(path, "wt", compresslevel=COMPRESS_LEVEL)
+        self.entries = 0
+
+        header = json.dumps({"version": HAR_VERSION, "creator": creator})
+        self.file.write('{"log": ' + header[:-1] + ', "entries": [')
+
+    def write(self, entry: dict[str, Any]) -> None:
+        """
+        Append an entry to the HAR file.
+        """
+        self.file.write(("\n" if self.entries == 0 else ",\n") + json.dumps(entry))
+        self.entries += 1
+
+    def close(self) -> None:
+        """
+        Complete and close the HAR file.
+        """
+        self.file.write("\n]}}\n")
+        self.file.close()
+
+    def __enter__(self) -> "HarWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def write_har(path: str, entries: Iterable[dict[str, Any]], creator: dict[str, Any]) -> int:
+    """
+    Write a HAR file from an iterable of entries.
+
+    Returns:
+        Number of entries written.
+    """
+    with HarWriter(path, creator) as writer:
+        for entry in entries:
+            writer.write(entry)
+    return writer.entries
+
+
+def iter_har_entries(path: str) -> Iterator[dict[str, Any]]:
+    """
+    Yield the entries of a HAR file one at a time.
+
+    Args:
+        path: Path of a HAR file written by HarWriter (`.json.gz`), or of an uncompressed HAR file (`.json`).
+    """
+    if not str(path).lower().endswith(HAR_EXTENSION):
+        with open(path) as file:
+            yield from json.load(file)["log"]["entries"]
+        return
+
+    with gzip.open(path, "rt") as file:
+        file.readline()  # Log header
+        for line in file:
+            if line.startswith("]"):  # End of entries
+                return
+            yield json.loads(line.rstrip().rstrip(","))
+
+
+def har_path(path: str) -> str:
+    """
+    Return the path of a HAR file given its path without extension, preferring the compressed file.
+
+    For example, `har_path("1/baseline")` returns `1/baseline.json.gz`, or `1/baseline.json` for older crawls.
+    """
+    if os.path.exists(path + HAR_EXTENSION):
+        return path + HAR_EXTENSION
+    return path + ".json"
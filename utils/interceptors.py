@@ -1,4 +1,7 @@
+from collections.abc import Callable
 from typing import Optional
+import threading
+import time
 
 import seleniumwire.request
 
@@ -89,3 +92,139 @@ def set_referer_interceptor(request: seleniumwire.request.Request, url: str, ref
     if URL(request.url) == URL(url):
         del request.headers["Referer"]
         request.headers["Referer"] = referer
+
+
+# File extensions of heavy resource types, used if the browser does not send Sec-Fetch-Dest.
+# Images are never blocked, since tracking pixels set cookies that the crawl must observe.
+RESOURCE_EXTENSIONS = {
+    "media": (".mp4", ".webm", ".ogg", ".ogv", ".mp3", ".m4a", ".m4s", ".m3u8", ".mpd", ".mov", ".wav", ".flac"),
+    "font": (".woff", ".woff2", ".ttf", ".otf", ".eot"),
+}
+
+# Sec-Fetch-Dest values of heavy resource types
+# See: https://developer.mozilla.org/en-US/docs/Web/HTTP/Headers/Sec-Fetch-Dest
+RESOURCE_DESTINATIONS = {
+    "video": "media",
+    "audio": "media",
+    "track": "media",
+    "font": "font",
+}
+
+
+def resource_type(request: seleniumwire.request.Request) -> Optional[str]:
+    """
+    Return the heavy resource type ("media" or "font") of a request, or None for other requests.
+    """
+    destination = request.headers.get("Sec-Fetch-Dest")
+    if destination is not None and destination != "empty":
+        return RESOURCE_DESTINATIONS.get(destination)
+
+    path = request.path.split("?")[0].lower()
+    for name, extensions in RESOURCE_EXTENSIONS.items():
+        if path.endswith(extensions):
+            return name
+    return None
+
+
+def block_resources_interceptor(request: seleniumwire.request.Request, resource_types: tuple[str, ...], hits: dict[str, int]) -> None:
+    """
+    Answer requests for heavy resources with an empty response instead of fetching them.
+
+    Blocked requests still appear in the HAR file, with an empty 204 response.
+
+    Args:
+        request: The request to modify.
+        resource_types: Resource types to block (see `resource_type`).
+        hits: Number of blocked requests of each resource type. Updated in place.
+    """
+    blocked = resource_type(request)
+    if blocked is None or blocked not in resource_types:
+        return
+
+    hits[blocked] = hits.get(blocked, 0) + 1
+    request.create_response(status_code=204, headers={"X-Resource-Policy": "blocked"}, body=b"")
+
+
+def block_navigation_interceptor(request: seleniumwire.request.Request, domain: str, blocked: list[str]) -> None:
+    """
+    Cancel top-level navigations that leave `domain`.
+
+    A 204 response to a navigation leaves the current page in place.
+    Only requests with a Sec-Fetch-Dest header are recognized as navigations,
+    which Firefox does not send to HTTP (non-HTTPS) URLs.
+
+    Args:
+        request: The request to modify.
+        domain: Domain that navigations must stay within.
+        blocked: URLs of cancelled navigations. Updated in place.
+    """
+    if request.headers.get("Sec-Fetch-Dest") != "document" or utils.get_domain(request.url) == domain:
+        return
+
+    blocked.append(request.url)
+    request.create_response(status_code=204, headers={"X-Navigation-Guard": "blocked"}, body=b"")
+
+
+class RequestTracker:
+    """
+    Track requests in flight through a web driver's proxy, without loading the captured requests.
+
+    The tracker is installed as the driver's request and response interceptors and calls
+    `self.interceptor`, so set the request interceptor with `tracker.interceptor = ...`
+    instead of `driver.request_interceptor = ...`.
+
+    Requests that fail without a response (e.g., reset connections) stay in flight.
+    Like `driver.requests`, only requests made since a given time are counted (see `in_flight`).
+    """
+
+    def __init__(self) -> None:
+        self.interceptor: Optional[Callable[[seleniumwire.request.Request], None]] = None
+
+        # Start times (seconds since epoch) of the requests in flight to each (method, URL), oldest first
+        self.started: dict[tuple[str, str], list[float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(request: seleniumwire.request.Request) -> tuple[str, str]:
+        # The proxy sends WebSocket requests with an HTTPS URL
+        return request.method, request.url.replace("wss://", "https://", 1)
+
+    def install(self, driver) -> None:
+        """
+        Set the tracker as the request and response interceptors of a seleniumwire driver.
+        """
+        driver.request_interceptor = self.request_interceptor
+        driver.response_interceptor = self.response_interceptor
+
+    def request_interceptor(self, request: seleniumwire.request.Request) -> None:
+        if self.interceptor is not None:
+            self.interceptor(request)
+
+        if request.response is not None:  # Answered by the interceptor
+            return
+
+        with self._lock:
+            self.started.setdefault(self._key(request), []).append(time.time())
+
+    def response_interceptor(self, request: seleniumwire.request.Request, response: seleniumwire.request.Response) -> None:
+        key = self._key(request)
+        with self._lock:
+            started = self.started.get(key)
+            if started:
+                started.pop(0)
+                if not started:
+                    del self.started[key]
+
+    def in_flight(self, since: float) -> int:
+        """
+        Return the number of requests made since `since` (seconds since epoch) that have not received a response.
+        """
+        with self._lock:
+            return sum(1 for started in self.started.values() for start in started if start >= since)
+
+    def clear(self) -> None:
+        """
+        Forget all requests in flight, e.g., when the captured requests are cleared.
+        """
+        with self._lock:
+            self.started.clear()
@@ -0,0 +1,313 @@
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any, Optional, TypedDict
+from urllib.parse import urljoin, urlsplit
+import asyncio
+import concurrent.futures
+import errno
+import json
+import os
+import socket
+import ssl
+
+"""
+Browserless DNS and reachability prefilter.
+
+Before any browser is started, each domain's URL variants (the same ones
+tried by Crawler.resolve_domain) are checked concurrently: DNS resolution,
+TCP/TLS connection, and an HTTP request whose redirects are followed.
+The first working variant is cached so the crawler can go straight to it,
+and domains where every variant fails to resolve or connect are dead.
+
+Any HTTP response counts as reachable, since many servers answer
+non-browser clients with errors (e.g., 403 from bot protection) that
+a browser would not get.
+
+DNS resolution and ports can be replaced by a local stand-in for testing
+(see prefilter_test.py).
+"""
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/115.0"
+MAX_REDIRECTS = 10
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Failure types shared with Crawler.get (see GetFailure in crawler.py)
+DNS = "dns"
+CONNECTION_REFUSED = "connection_refused"
+TLS = "tls"
+SLOW = "slow"
+UNREACHABLE = "unreachable"  # No route to the host's addresses, which may be a problem of the local network
+NO_RESPONSE = "no_response"  # Connected, but no valid HTTP response
+DEAD = {DNS, CONNECTION_REFUSED, TLS}  # Failures where a browser cannot load anything either. Timeouts are not proof of that
+
+Resolver = Callable[[str], Awaitable[list[str]]]
+
+
+class Reachability(TypedDict):
+    """
+    Prefilter result of a domain.
+    """
+
+    url: Optional[str]  # First working URL variant. None if no variant works
+    final_url: Optional[str]  # Where `url` redirects to
+    status: Optional[int]  # HTTP status of `final_url`
+    dead: bool  # If every variant failed to resolve or connect
+    failures: dict[str, str]  # Failure type of each variant tried before `url`
+
+
+class FetchFailure(Exception):
+    """
+    Raised when a URL cannot be fetched.
+    """
+
+    def __init__(self, failure: str) -> None:
+        super().__init__(failure)
+        self.failure = failure
+
+
+def variants(domain: str) -> list[str]:
+    """
+    Return the URL variants of a domain in the order tried by Crawler.resolve_domain.
+    """
+    return [f"https://{domain}", f"https://www.{domain}", f"http://{domain}", f"http://www.{domain}"]
+
+
+async def system_resolve(host: str) -> list[str]:
+    """
+    Resolve a host to its IP addresses with the system resolver.
+    """
+    infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    return list(dict.fromkeys(str(info[4][0]) for info in infos))
+
+
+class Prefilter:
+    """
+    Check the reachability of many domains concurrently.
+    """
+
+    def __init__(
+            self,
+            resolve: Resolver = system_resolve,
+            ports: Optional[dict[str, int]] = None,
+            timeout: float = 10,
+            concurrency: int = 500,
+    ) -> None:
+        """
+        Args:
+            resolve: Resolves a host to IP addresses. Defaults to the system resolver.
+            ports: Port of each scheme. Defaults to 80 for HTTP and 443 for HTTPS.
+            timeout: Maximum time (seconds) for each of DNS resolution, connecting, and receiving a response. Defaults to 10.
+            concurrency: Maximum number of domains checked at once. Defaults to 500.
+        """
+        self.resolve = resolve
+        self.ports = ports or DEFAULT_PORTS
+        self.timeout = timeout
+        self.concurrency = concurrency
+
+        # DNS lookups in progress are limited to the threads that run them (see check_all),
+        # so that a lookup's timeout only starts once a thread is running it
+        self.dns_concurrency = min(concurrency, 256)
+        self.dns_slots: Optional[asyncio.Semaphore] = None
+
+        # Certificates are not verified, as in the crawl (see seleniumwire's verify_ssl)
+        self.ssl_context = ssl.create_default_context()
+        self.ssl_context.check_hostname = False
+        self.ssl_context.verify_mode = ssl.CERT_NONE
+
+    async def resolve_host(self, host: str) -> list[str]:
+        """
+        Resolve a host, waiting for a free DNS slot before the timeout starts.
+
+        Raises:
+            FetchFailure: If the host cannot be resolved within the timeout.
+        """
+        if self.dns_slots is None:
+            self.dns_slots = asyncio.Semaphore(self.dns_concurrency)
+
+        await self.dns_slots.acquire()
+        # The slot is held until the lookup ends, even after a timeout, since its thread is busy until then
+        lookup = asyncio.ensure_future(self.resolve(host))
+        lookup.add_done_callback(lambda _: self.dns_slots.release())  # type: ignore[union-attr]
+
+        try:
+            addresses = await asyncio.wait_for(asyncio.shield(lookup), self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            raise FetchFailure(DNS)
+        if not addresses:
+            raise FetchFailure(DNS)
+        return addresses
+
+    async def connect(self, host: str, addresses: list[str], port: int, tls: bool) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """
+        Connect to the first of a host's addresses that accepts a connection, as a browser would.
+
+        Raises:
+            FetchFailure: If no address accepts a connection. If the addresses failed differently,
+                a failure that is not in DEAD is reported, since a browser might get through.
+        """
+        failures = []
+        for address in addresses:
+            try:
+                return await asyncio.wait_for(
+                    asyncio.open_connection(
+                        address,
+                        port,
+                        ssl=self.ssl_context if tls else None,
+                        server_hostname=host if tls else None,
+                    ),
+                    self.timeout,
+                )
+            except ConnectionRefusedError:
+                failures.append(CONNECTION_REFUSED)
+            except ssl.SSLError:
+                failures.append(TLS)
+            except asyncio.TimeoutError:
+                failures.append(SLOW)
+            except OSError as e:
+                if e.errno in (errno.ENETUNREACH, errno.EHOSTUNREACH, errno.EADDRNOTAVAIL):
+                    failures.append(UNREACHABLE)  # E.g., an IPv6 address without IPv6 connectivity
+                else:  # E.g., reset during the TLS handshake
+                    failures.append(TLS if tls else CONNECTION_REFUSED)
+
+        raise FetchFailure(next((failure for failure in failures if failure not in DEAD), failures[0]))
+
+    async def fetch(self, url: str) -> tuple[int, Optional[str]]:
+        """
+        Request a URL without following redirects.
+
+        Raises:
+            FetchFailure: If the URL cannot be fetched.
+
+        Returns:
+            The HTTP status and Location header.
+        """
+        parts = urlsplit(url)
+        host = parts.hostname or ""
+        port = parts.port or self.ports[parts.scheme]
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        addresses = await self.resolve_host(host)
+
+        reader, writer = await self.connect(host, addresses, port, parts.scheme == "https")
+
+        try:
+            request = (
+                f"GET {path} HTTP/1.1\r\n"
+                f"Host: {parts.netloc}\r\n"
+                f"User-Agent: {USER_AGENT}\r\n"
+                "Accept: text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8\r\n"
+                "Connection: close\r\n\r\n"
+            )
+            writer.write(request.encode())
+            await writer.drain()
+
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            raise FetchFailure(NO_RESPONSE)
+        finally:
+            writer.close()
+
+        lines = head.decode("latin-1").split("\r\n")
+        status_line = lines[0].split()
+        if len(status_line) < 2 or not status_line[1].isdigit():
+            raise FetchFailure(NO_RESPONSE)
+
+        location = None
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "location":
+                location = value.strip()
+
+        return int(status_line[1]), location
+
+    async def follow(self, url: str) -> tuple[str, int]:
+        """
+        Request a URL, following redirects.
+
+        Raises:
+            FetchFailure: If the URL or a redirect target cannot be fetched.
+
+        Returns:
+            The final URL and its HTTP status.
+        """
+        for _ in range(MAX_REDIRECTS):
+            status, location = await self.fetch(url)
+            if status not in (301, 302, 303, 307, 308) or location is None:
+                return url, status
+            url = urljoin(url, location)
+
+        return url, status
+
+    async def check(self, domain: str) -> Reachability:
+        """
+        Check the URL variants of a domain in order until one works.
+
+        A variant works if it responds without an HTTP error. If no variant does,
+        the first variant that responds at all is used.
+        """
+        result: Reachability = {"url": None, "final_url": None, "status": None, "dead": False, "failures": {}}
+        unresolvable_hosts: set[str] = set()
+
+        for url in variants(domain):
+            host = url.split("://")[1]
+            if host in unresolvable_hosts:
+                result["failures"][url] = DNS
+                continue
+
+            try:
+                final_url, status = await self.follow(url)
+            except FetchFailure as e:
+                result["failures"][url] = e.failure
+                if e.failure == DNS:
+                    unresolvable_hosts.add(host)
+                continue
+
+            if result["url"] is None:
+                result.update({"url": url, "final_url": final_url, "status": status})
+            if status < 400:
+                result.update({"url": url, "final_url": final_url, "status": status})
+                break
+            result["failures"][url] = f"http_{status}"
+
+        result["dead"] = result["url"] is None and all(failure in DEAD for failure in result["failures"].values())
+        return result
+
+    async def check_all(self, domains: Iterable[str]) -> dict[str, Reachability]:
+        """
+        Check many domains concurrently.
+        """
+        loop = asyncio.get_running_loop()
+        # getaddrinfo runs on the default executor, which would otherwise limit concurrent DNS lookups
+        loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(max_workers=self.dns_concurrency))
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def check(domain: str) -> tuple[str, Reachability]:
+            async with semaphore:
+                return domain, await self.check(domain)
+
+        return dict(await asyncio.gather(*(check(domain) for domain in domains)))
+
+
+def read_prefilter(path: str) -> dict[str, dict[str, Any]]:
+    """
+    Read cached prefilter results (see Reachability). Returns an empty dictionary if there are none.
+    """
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as file:
+        return json.load(file)
+
+
+def write_prefilter(path: str, results: dict[str, Reachability]) -> None:
+    """
+    Merge prefilter results into the cache.
+    """
+    cache: dict[str, Any] = read_prefilter(path)
+    cache.update(results)
+
+    with open(path + ".tmp", "w") as file:
+        json.dump(cache, file)
+    os.replace(path + ".tmp", path)
@@ -0,0 +1,192 @@
+from typing import Optional, TypedDict
+import logging
+import os
+import shutil
+import signal
+import tempfile
+import time
+
+from utils.resources import directory_size, process_start_time, process_tree, process_tree_cpu_time, process_tree_rss
+import config
+
+"""
+Process group and temp directory of a crawl process.
+
+Each crawl process starts its own process group and temp directory, so
+firefox, geckodriver, and their temp profiles all belong to the site.
+When the crawl process exits, or is killed, the supervisor kills whatever
+is left in the process group and removes the temp directory. While the
+site is crawled, the supervisor samples the resources used by the tree.
+
+A crawl that runs on a thread of the supervisor (see async_main.py) has no
+process group of its own. Its browser processes are tracked instead, and
+every descendant seen while sampling is killed if it outlives the crawl.
+"""
+
+logger = logging.getLogger(config.LOGGER_NAME)
+
+TEMP_PREFIX = "crawl-"
+
+
+def isolate(temp_dir: str) -> None:
+    """
+    Start a new process group and use `temp_dir` for all temp files. Called in the crawl process.
+    """
+    os.setpgrp()
+
+    os.environ["TMPDIR"] = temp_dir  # Inherited by geckodriver and firefox
+    tempfile.tempdir = temp_dir
+
+
+def remove_stale_temp_dirs() -> int:
+    """
+    Remove temp directories left by supervisors that no longer exist.
+
+    Returns:
+        Number of directories removed.
+    """
+    removed = 0
+    base = tempfile.gettempdir()
+    for name in os.listdir(base):
+        if not name.startswith(TEMP_PREFIX):
+            continue
+
+        pid = name[len(TEMP_PREFIX):].split("-")[0]
+        if not pid.isdigit() or os.path.exists(f"/proc/{pid}"):
+            continue
+
+        shutil.rmtree(os.path.join(base, name), ignore_errors=True)
+        removed += 1
+
+    return removed
+
+
+class ProcessStats(TypedDict):
+    """
+    Resources used by a crawl (see CrawlResults).
+    """
+
+    peak_rss: int
+    cpu_time: float
+    peak_temp_bytes: int
+
+
+class SiteProcessGroup:
+    """
+    Resources of a crawl process and its descendants, tracked by the supervisor.
+    """
+
+    def __init__(self, domain: str) -> None:
+        """
+        Args:
+            domain: Domain being crawled, used to name the temp directory.
+        """
+        # Named after the supervisor so leftovers of a killed supervisor can be found
+        self.temp_dir = tempfile.mkdtemp(prefix=f"{TEMP_PREFIX}{os.getpid()}-{domain}-")
+
+        self.pid: Optional[int] = None
+        self.start_time = time.time()
+
+        # Browser processes of a crawl without a process group, and their descendants seen so far.
+        # Start times tell them apart from later processes that reuse their PIDs.
+        self.browser_pids: list[int] = []
+        self.members: dict[int, Optional[int]] = {}
+
+        self.peak_rss = 0
+        self.cpu_time = 0.0
+        self.peak_temp_bytes = 0
+
+    def start(self, pid: int) -> None:
+        """
+        Start tracking the crawl process with the given PID.
+        """
+        self.pid = pid
+
+    def track(self, browser_pids: list[int]) -> None:
+        """
+        Track the browser processes (e.g., geckodriver) of a crawl that runs in the supervisor's own process.
+        Their descendants are found when sampling.
+        """
+        for pid in browser_pids:
+            if pid not in self.browser_pids:
+                self.browser_pids.append(pid)
+
+    def sample(self) -> None:
+        """
+        Measure the memory, CPU time, and temp disk usage of the process tree.
+        """
+        if self.pid is not None:
+            self.peak_rss = max(self.peak_rss, process_tree_rss(self.pid))
+            self.cpu_time = max(self.cpu_time, process_tree_cpu_time(self.pid))
+        elif self.browser_pids:
+            # Browsers that have exited are not followed, since their PIDs may have been reused
+            live = []
+            for root in self.browser_pids:
+                start_time = process_start_time(root)
+                if start_time is not None and self.members.setdefault(root, start_time) == start_time:
+                    live.append(root)
+
+            for root in live:
+                for pid in process_tree(root):
+                    self.members.setdefault(pid, process_start_time(pid))
+            self.peak_rss = max(self.peak_rss, sum(process_tree_rss(root) for root in live))
+            self.cpu_time = max(self.cpu_time, sum(process_tree_cpu_time(root) for root in live))
+        else:
+            return
+
+        self.peak_temp_bytes = max(self.peak_temp_bytes, directory_size(self.temp_dir))
+
+    def reap(self) -> int:
+        """
+        Kill all processes left in the process group, or left of the tracked browsers, and remove the temp directory.
+
+        Call after the crawl process has exited, or after the crawl has quit its browsers.
+
+        Returns:
+            Number of processes killed.
+        """
+        self.peak_temp_bytes = max(self.peak_temp_bytes, directory_size(self.temp_dir))
+
+        orphans = 0
+        if self.pid is not None:
+            orphans = sum(1 for pid in process_tree(1) if self.in_group(pid))
+            try:
+                os.killpg(self.pid, signal.SIGKILL)
+            except ProcessLookupError:  # Group is empty
+                pass
+        elif self.browser_pids:
+            self.sample()
+            for pid, start_time in self.members.items():
+                if start_time is None or process_start_time(pid) != start_time:
+                    continue
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                    orphans += 1
+                except ProcessLookupError:
+                    pass
+
+        if orphans:
+            owner = f"process group {self.pid}" if self.pid is not None else f"browsers {self.browser_pids}"
+            logger.warning(f"Killed {orphans} leftover processes of {owner}.")
+
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        return orphans
+
+    def in_group(self, pid: int) -> bool:
+        """
+        Return True iff the process is a member of the crawl process group.
+        """
+        try:
+            return os.getpgid(pid) == self.pid
+        except ProcessLookupError:
+            return False
+
+    def stats(self) -> ProcessStats:
+        """
+        Return the measured resources of the crawl.
+        """
+        return {
+            "peak_rss": self.peak_rss,
+            "cpu_time": self.cpu_time,
+            "peak_temp_bytes": self.peak_temp_bytes,
+        }
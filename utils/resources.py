@@ -0,0 +1,112 @@
+import os
+from typing import Optional
+
+"""
+Node resource measurements.
+
+Values are read from /proc, so these functions only work on Linux.
+"""
+
+
+def available_memory() -> int:
+    """
+    Return the memory (bytes) available for starting new processes without swapping.
+    """
+    with open("/proc/meminfo") as file:
+        for line in file:
+            if line.startswith("MemAvailable:"):
+                return int(line.split()[1]) * 1024  # Reported in kB
+
+    raise RuntimeError("MemAvailable not found in /proc/meminfo.")
+
+
+def load_per_cpu() -> float:
+    """
+    Return the 1-minute load average divided by the number of usable CPUs.
+    """
+    return os.getloadavg()[0] / len(os.sched_getaffinity(0))
+
+
+def process_tree(pid: int) -> list[int]:
+    """
+    Return the PIDs of a process and all of its descendants.
+    """
+    children: dict[int, list[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as file:
+                stat = file.read()
+        except OSError:  # Process exited
+            continue
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])  # The command name may contain spaces
+        children.setdefault(ppid, []).append(int(entry))
+
+    pids = [pid]
+    for parent in pids:
+        pids.extend(children.get(parent, []))
+    return pids
+
+
+def process_start_time(pid: int) -> Optional[int]:
+    """
+    Return the start time (clock ticks after boot) of a live process, or None if it has exited.
+
+    Tells a process apart from a later process that reuses its PID.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            fields = file.read().rsplit(")", 1)[1].split()
+    except OSError:  # Process exited
+        return None
+    if fields[0] == "Z":  # Exited, but not yet waited for
+        return None
+    return int(fields[19])
+
+
+def process_tree_rss(pid: int) -> int:
+    """
+    Return the total resident memory (bytes) of a process and all of its descendants.
+    """
+    total = 0
+    for child in process_tree(pid):
+        try:
+            with open(f"/proc/{child}/status") as file:
+                for line in file:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024  # Reported in kB
+                        break
+        except OSError:  # Process exited
+            continue
+    return total
+
+
+def process_tree_cpu_time(pid: int) -> float:
+    """
+    Return the CPU time (seconds) used by a process and all of its descendants,
+    including descendants that have exited and been waited for.
+    """
+    ticks = 0
+    for child in process_tree(pid):
+        try:
+            with open(f"/proc/{child}/stat") as file:
+                fields = file.read().rsplit(")", 1)[1].split()
+        except OSError:  # Process exited
+            continue
+        ticks += sum(int(field) for field in fields[11:15])  # utime, stime, cutime, cstime
+    return ticks / os.sysconf("SC_CLK_TCK")
+
+
+def directory_size(path: str) -> int:
+    """
+    Return the total size (bytes) of all files under a directory.
+    """
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:  # File removed
+                continue
+    return total
@@ -0,0 +1,211 @@
+from pathlib import Path
+from typing import Any, Iterator, Optional, Union
+import argparse
+import heapq
+import json
+import os
+import re
+import time
+
+from filelock import FileLock
+
+"""
+Append-only log of crawl results.
+
+Each worker appends one JSON line per domain to its own shard
+(e.g., results/3.jsonl), so recording a result costs O(1) regardless of crawl size.
+Shards are merged into results/compacted.jsonl by `compact`.
+
+Each line records when it was written, and shards are merged in that
+order. If a domain appears more than once (e.g., a site requeued to
+another worker), the most recently written result wins.
+"""
+
+COMPACTED_NAME = "compacted.jsonl"
+
+
+class ResultsLog:
+    """
+    Per-worker shard of the results log.
+    """
+
+    def __init__(self, path: Union[str, Path], shard: str, cls: Optional[type[json.JSONEncoder]] = None) -> None:
+        """
+        Args:
+            path: Results log directory. Created if it does not exist.
+            shard: Name of this worker's shard (e.g., the SLURM_ARRAY_TASK_ID).
+            cls: JSON encoder used to serialize results. Defaults to None, where the default encoder is used.
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self.shard_path = self.path / f"{shard}.jsonl"
+        self.lock = FileLock(str(self.shard_path) + ".lock", timeout=60)
+        self.cls = cls
+
+    def append(self, domain: str, result: Any) -> None:
+        """
+        Append the result for a domain to this shard.
+
+        Args:
+            domain: The crawled domain.
+            result: The result of the crawl (e.g., CrawlResults).
+        """
+        line = json.dumps({"domain": domain, "time": time.time(), "result": result}, cls=self.cls) + "\n"
+
+        # The lock is only contended by `compact`
+        with self.lock:
+            with open(self.shard_path, "ab+") as file:
+                # Terminate a line left incomplete by a killed worker
+                if file.tell() > 0:
+                    file.seek(-1, os.SEEK_END)
+                    if file.read(1) != b"\n":
+                        line = "\n" + line
+
+                file.write(line.encode())
+                file.flush()
+                os.fsync(file.fileno())
+
+
+def _shard_order(shard: Path) -> list[Union[int, str]]:
+    """
+    Return the sort key of a shard, which orders numbers in its name numerically (e.g., `3.jsonl` before `10.jsonl`).
+    """
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", shard.stem)]
+
+
+def _shards(path: Path) -> list[Path]:
+    """
+    Return worker shards in a results log directory.
+    """
+    return sorted((p for p in path.glob("*.jsonl") if p.name != COMPACTED_NAME), key=_shard_order)
+
+
+def _read_entries(file_path: Path) -> Iterator[tuple[float, str, Any]]:
+    """
+    Yield (time, domain, result) triples from a JSONL file.
+
+    Lines written before times were recorded have time 0.
+    A truncated last line (e.g., from a worker killed mid-write) is skipped.
+    """
+    with open(file_path) as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            yield entry.get("time", 0), entry["domain"], entry["result"]
+
+
+def _read_lines(file_path: Path) -> Iterator[tuple[str, Any]]:
+    """
+    Yield (domain, result) pairs from a JSONL file.
+    """
+    for _, domain, result in _read_entries(file_path):
+        yield domain, result
+
+
+def _read_shards(shards: list[Path]) -> Iterator[tuple[str, Any]]:
+    """
+    Yield (domain, result) pairs from worker shards in the order they were written.
+
+    Each shard is in write order, so the shards are merged by time. Lines without
+    a time are yielded first, in shard order.
+    """
+    entries = heapq.merge(*(_read_entries(shard) for shard in shards), key=lambda entry: entry[0])
+    for _, domain, result in entries:
+        yield domain, result
+
+
+def iter_results(path: Union[str, Path]) -> Iterator[tuple[str, Any]]:
+    """
+    Yield (domain, result) pairs from a results log in write order.
+
+    Duplicate domains are not removed; see `read_results`.
+
+    Args:
+        path: Results log directory, or a legacy results.json file.
+    """
+    path = Path(path)
+
+    if path.is_file():  # Legacy results.json
+        with open(path) as file:
+            yield from json.load(file).items()
+        return
+
+    compacted = path / COMPACTED_NAME
+    if compacted.is_file():
+        yield from _read_lines(compacted)
+
+    yield from _read_shards(_shards(path))
+
+
+def read_results(path: Union[str, Path]) -> dict[str, Any]:
+    """
+    Read a results log into a dictionary mapping domain to result.
+
+    Use this in place of `json.load` on results.json.
+
+    Args:
+        path: Results log directory, or a legacy results.json file.
+    """
+    return dict(iter_results(path))
+
+
+def compact(path: Union[str, Path]) -> int:
+    """
+    Merge all shards into a single deduplicated file and truncate the shards.
+
+    Safe to run while workers are appending.
+
+    Args:
+        path: Results log directory.
+
+    Returns:
+        Number of domains in the compacted log.
+    """
+    path = Path(path)
+    compacted = path / COMPACTED_NAME
+
+    # Shards created after this point are left for the next compaction
+    shards = _shards(path)
+    locks = [FileLock(str(shard) + ".lock", timeout=60) for shard in shards]
+
+    for lock in locks:
+        lock.acquire()
+    try:
+        results: dict[str, Any] = {}
+        if compacted.is_file():
+            results.update(_read_lines(compacted))
+        results.update(_read_shards(shards))
+
+        temp = path / (COMPACTED_NAME + ".tmp")
+        with open(temp, "w") as file:
+            for domain, result in results.items():
+                file.write(json.dumps({"domain": domain, "result": result}) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp, compacted)
+
+        for shard in shards:
+            open(shard, "w").close()
+    finally:
+        for lock in locks:
+            lock.release()
+
+    return len(results)
+
+
+if __name__ == "__main__":
+    import config
+
+    parser = argparse.ArgumentParser(description="Compact the results log of a crawl.")
+    parser.add_argument(
+        "path",
+        nargs="?",
+        default=config.RESULTS_PATH,
+        help="Results log directory. Defaults to config.RESULTS_PATH.",
+    )
+    args = parser.parse_args()
+
+    print(f"Compacted {compact(args.path)} results.")
@@ -0,0 +1,106 @@
+from collections import defaultdict
+from collections.abc import Iterable, Mapping
+from typing import Any, Optional
+import math
+import statistics
+
+"""
+Estimate the crawl time of each site from prior crawls.
+
+Sites are crawled longest expected first, so slow sites do not
+leave a long tail at the end of a crawl.
+"""
+
+DEFAULT_COST = 600  # Seconds, used when there is no prior data at all
+DEFAULT_TIME_PER_ACTION = 10  # Seconds, used when no prior result has both a total time and actions
+
+
+def _actions(result: Mapping[str, Any]) -> Optional[int]:
+    """
+    Return the amount of work in a prior result: actions taken plus traversal failures.
+
+    Returns None if the result has no clickstream data.
+    """
+    clickstreams = result.get("clickstream")
+    if not clickstreams:
+        return None
+
+    # Getting the landing page counts as an action (see classification_algo)
+    actions = sum(len(clickstream) + 1 for clickstream in clickstreams)
+    actions += sum((result.get("traversal_failures") or {}).values())
+    return actions
+
+
+def _rank_tier(rank: int) -> int:
+    """
+    Group Tranco ranks into tiers of doubling size (1, 2-3, 4-7, ...).
+    """
+    return int(math.log2(rank))
+
+
+def estimate_costs(domains: list[str], prior_results: Iterable[Mapping[str, Mapping[str, Any]]]) -> dict[str, float]:
+    """
+    Estimate the crawl time (seconds) of each domain.
+
+    In order of preference, the estimate for a domain is:
+    1. the mean `total_time` of the domain in prior crawls,
+    2. its prior number of actions and traversal failures times the mean time per action
+       (or `DEFAULT_TIME_PER_ACTION`, since older results only have `total_time` for killed crawls),
+    3. the median estimate of domains in the same Tranco rank tier,
+    4. the median estimate of all domains.
+
+    Args:
+        domains: Domains ordered by Tranco rank (i.e., a site list).
+        prior_results: Results of prior crawls (see `read_results`).
+
+    Returns:
+        Dictionary mapping each domain to its expected crawl time.
+    """
+    times: dict[str, list[float]] = defaultdict(list)
+    actions: dict[str, list[int]] = defaultdict(list)
+    for results in prior_results:
+        for domain, result in results.items():
+            if result.get("total_time") is not None:
+                times[domain].append(result["total_time"])
+            if (n := _actions(result)) is not None:
+                actions[domain].append(n)
+
+    # Mean time per action for domains with both measurements
+    total_time = sum(statistics.mean(times[d]) for d in times if d in actions)
+    total_actions = sum(statistics.mean(actions[d]) for d in times if d in actions)
+    time_per_action = total_time / total_actions if total_actions else DEFAULT_TIME_PER_ACTION
+
+    costs: dict[str, float] = {}
+    for domain in domains:
+        if times[domain]:
+            costs[domain] = statistics.mean(times[domain])
+        elif actions[domain]:
+            costs[domain] = statistics.mean(actions[domain]) * time_per_action
+
+    # Fall back on Tranco rank for unseen domains
+    tiers: dict[int, list[float]] = defaultdict(list)
+    for rank, domain in enumerate(domains, start=1):
+        if domain in costs:
+            tiers[_rank_tier(rank)].append(costs[domain])
+    overall = statistics.median(costs.values()) if costs else DEFAULT_COST
+
+    for rank, domain in enumerate(domains, start=1):
+        if domain not in costs:
+            tier = tiers.get(_rank_tier(rank))
+            costs[domain] = statistics.median(tier) if tier else overall
+
+    return costs
+
+
+def order_by_cost(domains: list[str], prior_results: Iterable[Mapping[str, Mapping[str, Any]]]) -> list[str]:
+    """
+    Return domains ordered by expected crawl time, longest first.
+
+    Ties keep their Tranco rank order.
+
+    Args:
+        domains: Domains ordered by Tranco rank (i.e., a site list).
+        prior_results: Results of prior crawls (see `read_results`).
+    """
+    costs = estimate_costs(domains, prior_results)
+    return sorted(domains, key=lambda domain: -costs[domain])
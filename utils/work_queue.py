@@ -0,0 +1,309 @@
+from collections.abc import Iterable
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import sqlite3
+import time
+
+"""
+SQLite-backed work queue shared by all crawl workers.
+
+Domains are leased rather than popped. A lease that is not acknowledged
+before its visibility timeout expires is returned to the queue, so a domain
+held by a crashed or hung worker is picked up again automatically.
+
+NOTE: SQLite relies on POSIX advisory locks. These work on most NFS mounts,
+but WAL mode does not, so the default rollback journal is used.
+"""
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS queue (
+        domain TEXT PRIMARY KEY,
+        position INTEGER NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        worker TEXT,
+        lease_expires REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS queue_status_position ON queue (status, position)",
+)
+
+
+class WorkQueue:
+    """
+    Queue of domains to crawl with atomic lease/ack/nack.
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = 60 * 60, max_attempts: int = 3) -> None:
+        """
+        Args:
+            path: Path of the SQLite database. Created if it does not exist.
+            visibility_timeout: Seconds a lease is held before the domain is returned to the queue. Defaults to 1 hour.
+            max_attempts: Number of leases after which an unacknowledged domain is marked as failed. Defaults to 3.
+        """
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+
+        with self._transaction() as db:
+            for statement in SCHEMA:
+                db.execute(statement)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Open a connection and hold the database write lock for the duration of the block.
+
+        A new connection is opened for every transaction so that a WorkQueue
+        can safely be shared with forked worker processes.
+        """
+        db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    def _reclaim_expired(self, db: sqlite3.Connection) -> None:
+        """
+        Return expired leases to the queue, or fail them if they have used up their attempts.
+        """
+        now = time.time()
+        db.execute(
+            "UPDATE queue SET status = ?, worker = NULL, lease_expires = NULL "
+            "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+            (FAILED, LEASED, now, self.max_attempts),
+        )
+        db.execute(
+            "UPDATE queue SET status = ?, worker = NULL, lease_expires = NULL "
+            "WHERE status = ? AND lease_expires < ?",
+            (PENDING, LEASED, now),
+        )
+
+    def enqueue(self, domains: Iterable[str]) -> int:
+        """
+        Append domains to the end of the queue in a single transaction.
+
+        Domains already in the queue (in any state) are ignored.
+
+        Args:
+            domains: Domains to enqueue.
+
+        Returns:
+            Number of domains that were added.
+        """
+        with self._transaction() as db:
+            position = db.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM queue").fetchone()[0]
+            before = db.total_changes
+            db.executemany(
+                "INSERT OR IGNORE INTO queue (domain, position) VALUES (?, ?)",
+                ((domain, position + i) for i, domain in enumerate(domains)),
+            )
+            return db.total_changes - before
+
+    def requeue(self, domains: Iterable[str]) -> None:
+        """
+        Put domains back at the end of the queue regardless of their state.
+
+        Domains not in the queue are added. Domains that are currently leased are
+        skipped, since they are being crawled. Expired leases are requeued.
+
+        Args:
+            domains: Domains to requeue.
+        """
+        with self._transaction() as db:
+            position = db.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM queue").fetchone()[0]
+            now = time.time()
+            db.executemany(
+                "INSERT INTO queue (domain, position) VALUES (?, ?) "
+                "ON CONFLICT (domain) DO UPDATE SET position = excluded.position, "
+                "status = 'pending', attempts = 0, worker = NULL, lease_expires = NULL "
+                "WHERE queue.status != ? OR queue.lease_expires < ?",
+                ((domain, position + i, LEASED, now) for i, domain in enumerate(domains)),
+            )
+
+    def reorder(self, domains: Iterable[str]) -> None:
+        """
+        Reorder pending domains.
+
+        Pending domains are leased in the order of `domains`, followed by
+        any pending domains not in `domains` in their current order.
+
+        Args:
+            domains: Domains in the desired order. Domains that are not pending are ignored.
+        """
+        with self._transaction() as db:
+            pending = [row[0] for row in db.execute("SELECT domain FROM queue WHERE status = ? ORDER BY position", (PENDING,))]
+            pending_set = set(pending)
+
+            order = list(dict.fromkeys(domain for domain in domains if domain in pending_set))
+            ordered = set(order)
+            order.extend(domain for domain in pending if domain not in ordered)
+
+            position = db.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM queue").fetchone()[0]
+            db.executemany(
+                "UPDATE queue SET position = ? WHERE domain = ?",
+                ((position + i, domain) for i, domain in enumerate(order)),
+            )
+
+    def lease(self, worker: str = "") -> Optional[str]:
+        """
+        Lease the next pending domain.
+
+        Args:
+            worker: Identifier of the leasing worker, for bookkeeping only.
+
+        Returns:
+            The leased domain, or None if no domain is pending.
+        """
+        with self._transaction() as db:
+            self._reclaim_expired(db)
+
+            row = db.execute(
+                "SELECT domain FROM queue WHERE status = ? ORDER BY position LIMIT 1",
+                (PENDING,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            domain = row[0]
+            db.execute(
+                "UPDATE queue SET status = ?, attempts = attempts + 1, worker = ?, lease_expires = ? WHERE domain = ?",
+                (LEASED, worker, time.time() + self.visibility_timeout, domain),
+            )
+            return domain
+
+    def extend(self, domain: str, worker: str, timeout: Optional[float] = None) -> bool:
+        """
+        Extend the lease on a domain.
+
+        Args:
+            domain: The leased domain.
+            worker: Identifier of the worker holding the lease (see `lease`).
+            timeout: Seconds from now until the lease expires. Defaults to the visibility timeout.
+
+        Returns:
+            True iff `worker` holds the lease.
+        """
+        timeout = self.visibility_timeout if timeout is None else timeout
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE queue SET lease_expires = ? WHERE domain = ? AND status = ? AND worker = ?",
+                (time.time() + timeout, domain, LEASED, worker),
+            )
+            return cursor.rowcount > 0
+
+    def ack(self, domain: str, worker: Optional[str] = None) -> bool:
+        """
+        Mark a domain as done.
+
+        Args:
+            domain: The domain.
+            worker: Identifier of the worker holding the lease (see `lease`).
+                Defaults to None, for a domain that is not leased (e.g., completed by the prefilter).
+
+        Returns:
+            True iff the domain was marked as done. A worker whose lease expired and was
+            taken by another worker cannot complete the domain.
+        """
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE queue SET status = ?, worker = NULL, lease_expires = NULL WHERE domain = ? AND worker IS ?",
+                (DONE, domain, worker),
+            )
+            return cursor.rowcount > 0
+
+    def nack(self, domain: str, worker: str) -> bool:
+        """
+        Release a leased domain back to its original place in the queue.
+
+        The domain is marked as failed instead if it has used up its attempts.
+
+        Args:
+            domain: The leased domain.
+            worker: Identifier of the worker holding the lease (see `lease`).
+
+        Returns:
+            True iff the domain was returned to the queue.
+        """
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT attempts FROM queue WHERE domain = ? AND status = ? AND worker = ?",
+                (domain, LEASED, worker),
+            ).fetchone()
+            if row is None:
+                return False
+
+            requeue = row[0] < self.max_attempts
+            db.execute(
+                "UPDATE queue SET status = ?, worker = NULL, lease_expires = NULL WHERE domain = ? AND worker = ?",
+                (PENDING if requeue else FAILED, domain, worker),
+            )
+            return requeue
+
+    def domains(self, status: str = PENDING) -> list[str]:
+        """
+        Return domains with the given status in queue order.
+        """
+        with self._transaction() as db:
+            self._reclaim_expired(db)
+            rows = db.execute("SELECT domain FROM queue WHERE status = ? ORDER BY position", (status,)).fetchall()
+        return [row[0] for row in rows]
+
+    def leases(self) -> dict[str, str]:
+        """
+        Return a dictionary mapping each worker that holds a lease to its leased domain.
+        """
+        with self._transaction() as db:
+            self._reclaim_expired(db)
+            rows = db.execute("SELECT worker, domain FROM queue WHERE status = ?", (LEASED,)).fetchall()
+        return dict(rows)
+
+    def counts(self) -> dict[str, int]:
+        """
+        Return the number of domains in each state.
+        """
+        with self._transaction() as db:
+            self._reclaim_expired(db)
+            rows = db.execute("SELECT status, COUNT(*) FROM queue GROUP BY status").fetchall()
+
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+
+def read_domains(path: str, status: str = PENDING, max_attempts: int = 3) -> list[str]:
+    """
+    Return domains with the given status in queue order, without modifying the queue.
+
+    Unlike WorkQueue.domains, this opens the database read-only, so it is safe to use on the queue
+    of a running crawl (e.g., in analysis scripts). Expired leases are reported with the status
+    they will have once reclaimed.
+
+    Args:
+        path: Path of the SQLite database.
+        status: Status of the domains to return. Defaults to PENDING.
+        max_attempts: Number of leases after which an unacknowledged domain is failed (see WorkQueue). Defaults to 3.
+    """
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=60)
+    try:
+        rows = db.execute(
+            "SELECT domain FROM queue WHERE "
+            "CASE WHEN status = ? AND lease_expires < ? THEN (CASE WHEN attempts >= ? THEN ? ELSE ? END) ELSE status END = ? "
+            "ORDER BY position",
+            (LEASED, time.time(), max_attempts, FAILED, PENDING, status),
+        ).fetchall()
+    finally:
+        db.close()
+    return [row[0] for row in rows]
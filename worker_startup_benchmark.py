@@ -0,0 +1,70 @@
+import argparse
+import multiprocessing as mp
+import statistics
+import subprocess
+import sys
+import time
+
+"""
+Benchmark the startup time of crawl processes.
+
+Measures:
+1. Import time of crawler.py and of BannerClick (now imported lazily) in a fresh interpreter.
+2. Time from starting a crawl process until it has imported crawler.py,
+   for each multiprocessing start method (see WORKER_START_METHOD in config.py).
+"""
+
+
+def import_time(module: str) -> float:
+    """
+    Return the time (seconds) to import `module` in a fresh interpreter.
+    """
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(output.stdout)
+
+
+def ready(queue: mp.Queue) -> None:
+    """
+    Crawl process stand-in that reports when it is ready to crawl.
+    """
+    import crawler  # noqa: F401  # Already imported if preloaded by the forkserver
+    queue.put(time.time())
+
+
+def launch_time(method: str, trials: int) -> list[float]:
+    """
+    Return the time (seconds) from starting a process until it is ready to crawl, for each trial.
+    """
+    ctx = mp.get_context(method)
+    if method == "forkserver":
+        ctx.set_forkserver_preload(["crawler"])  # type: ignore[attr-defined]
+
+    queue = ctx.Queue()
+    times = []
+    for _ in range(trials):
+        start = time.time()
+        process = ctx.Process(target=ready, args=(queue,))  # type: ignore[attr-defined]
+        process.start()
+        times.append(queue.get() - start)
+        process.join()
+
+    return times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of crawl processes.")
+    parser.add_argument("--trials", type=int, default=10)
+    args = parser.parse_args()
+
+    print("Import time (fresh interpreter)")
+    for module in ["crawler", "bannerclick.bannerdetection"]:
+        times = [import_time(module) for _ in range(args.trials)]
+        print(f"{module}: {statistics.median(times):.3f} s (median of {args.trials})")
+    print()
+
+    print("Crawl process launch time")
+    for method in ["spawn", "fork", "forkserver"]:
+        times = launch_time(method, args.trials)
+        # The first forkserver launch includes starting the server itself
+        print(f"{method}: {statistics.median(times):.3f} s (median of {args.trials}), first {times[0]:.3f} s")
@@ -0,0 +1,111 @@
+import logging
+import multiprocessing as mp
+import tempfile
+from typing import Any, Optional
+
+from crawler import Crawler, CrawlInterrupted, CrawlResults, LandingPageDown
+import main
+
+"""
+Test that main.worker sends a result for every crawl, with a stubbed crawler that launches no browser.
+
+Run with `python3 worker_test.py` or pytest.
+"""
+
+
+class StubCrawler:
+    """
+    Stands in for Crawler. classification_algo is wrapped by the real @crawl_algo.
+    """
+
+    error: Optional[Exception] = None  # Raised by classification_algo
+
+    def __init__(self, domain: str, heartbeat: Any = None, **kwargs: Any) -> None:
+        self.domain = domain
+        self.heartbeat_callback = heartbeat
+        self.results: CrawlResults = {
+            "url": None,
+            "data_path": f"stub/{domain}/",
+            "landing_page_down": False,
+            "unexpected_exception": False,
+        }
+
+    @Crawler.crawl_algo
+    def classification_algo(self, total_actions: int, clickstream_length: int) -> None:
+        self.heartbeat_callback({"time": 0, "phase": "baseline", "clickstream": 0, "action": None, "actions": 0})
+        Crawler.logger.info(f"Crawling '{self.domain}'.")
+        if StubCrawler.error is not None:
+            raise StubCrawler.error
+        self.results["url"] = f"https://{self.domain}/"
+
+    def close_driver_pool(self) -> None:
+        pass
+
+
+def run_worker(domain: str, error: Optional[Exception] = None) -> tuple[CrawlResults, list[Any], list[logging.LogRecord]]:
+    """
+    Run main.worker in a crawl process and return its result, heartbeats, and log records.
+    """
+    main.Crawler = StubCrawler  # type: ignore[misc, assignment]
+    StubCrawler.error = error
+
+    ctx = mp.get_context("fork")  # The crawl process inherits the stub
+    queue, heartbeats, log_queue = ctx.Queue(), ctx.Queue(), ctx.Queue()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        process = ctx.Process(target=main.worker, args=(domain, queue, heartbeats, log_queue, temp_dir, None, None, None))
+        process.start()
+        result = queue.get(timeout=30)
+        process.join(30)
+
+    assert process.exitcode == 0, process.exitcode
+
+    received_heartbeats = []
+    while not heartbeats.empty():
+        received_heartbeats.append(heartbeats.get())
+    records = []
+    while not log_queue.empty():
+        records.append(log_queue.get())
+    return result, received_heartbeats, records
+
+
+def test_completed_crawl() -> None:
+    result, heartbeats, records = run_worker("example.com")
+
+    assert result["url"] == "https://example.com/"
+    assert result["landing_page_down"] is False
+    assert result["unexpected_exception"] is False
+    assert result["cpu_time"] > 0
+    assert [heartbeat["phase"] for heartbeat in heartbeats] == ["baseline"]
+    assert any("Crawling 'example.com'." in record.getMessage() for record in records)
+
+
+def test_landing_page_down() -> None:
+    result, _, _ = run_worker("down.example", LandingPageDown())
+
+    assert result["landing_page_down"] is True
+    assert result["unexpected_exception"] is False
+    assert "cpu_time" in result
+
+
+def test_unexpected_exception() -> None:
+    result, _, _ = run_worker("broken.example", ValueError("broken"))
+
+    assert result["landing_page_down"] is False
+    assert result["unexpected_exception"] is True
+    assert "cpu_time" in result
+
+
+def test_interrupted() -> None:
+    result, _, _ = run_worker("stopped.example", CrawlInterrupted("stalled"))
+
+    assert result["interrupted"] is True
+    assert result["unexpected_exception"] is False
+    assert "cpu_time" in result
+
+
+if __name__ == "__main__":
+    test_completed_crawl()
+    test_landing_page_down()
+    test_unexpected_exception()
+    test_interrupted()
+    print("All tests passed.")